@@ -0,0 +1,35 @@
+"""Unique (follower_id, followed_id) and followed_id index on follows
+
+Revision ID: 3d7b9e2f4a10
+Revises: 8f3a2c61d7e4
+Create Date: 2026-10-19 12:41:05.530219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '3d7b9e2f4a10'
+down_revision: Union[str, None] = '8f3a2c61d7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Racing double-clicks could have inserted the same edge twice; keep the oldest row
+    op.execute(
+        "DELETE FROM follows WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM follows GROUP BY follower_id, followed_id) AS keep)"
+    )
+
+    with op.batch_alter_table('follows') as batch_op:
+        batch_op.create_unique_constraint('uq_follows_follower_id_followed_id', ['follower_id', 'followed_id'])
+        batch_op.create_index('ix_follows_followed_id', ['followed_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('follows') as batch_op:
+        batch_op.drop_index('ix_follows_followed_id')
+        batch_op.drop_constraint('uq_follows_follower_id_followed_id', type_='unique')
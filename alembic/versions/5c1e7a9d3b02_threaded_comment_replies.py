@@ -0,0 +1,54 @@
+"""Threaded comment replies (parent_id + materialized path)
+
+Revision ID: 5c1e7a9d3b02
+Revises: 4146fabcb8be
+Create Date: 2026-10-19 09:12:44.512031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e7a9d3b02'
+down_revision: Union[str, None] = '4146fabcb8be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+# Binary collation, so "/" sorts below "0" as the subtree ranges assume
+PATH_TYPE = (
+    sa.String(length=255)
+    .with_variant(sa.String(length=255, collation='C'), 'postgresql')
+    .with_variant(sa.String(length=255, collation='utf8mb4_bin'), 'mysql')
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.add_column(sa.Column('parent_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('path', PATH_TYPE, nullable=True))
+        batch_op.add_column(sa.Column('depth', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_foreign_key('comments_parent_fk', 'comments', ['parent_id'], ['id'], ondelete='CASCADE')
+        batch_op.create_index('ix_comments_parent_id', ['parent_id'], unique=False)
+        batch_op.create_index('ix_comments_blog_id_path', ['blog_id', 'path'], unique=False)
+
+    # Existing comments are all top-level, so their path is just their own zero-padded id
+    conn = op.get_bind()
+    comments = sa.table('comments', sa.column('id', sa.Integer), sa.column('path', sa.String))
+    ids = [row.id for row in conn.execute(sa.select(comments.c.id).order_by(comments.c.id))]
+    update = comments.update().where(comments.c.id == sa.bindparam('comment_id')).values(path=sa.bindparam('new_path'))
+    for start in range(0, len(ids), BACKFILL_BATCH_SIZE):
+        batch = ids[start:start + BACKFILL_BATCH_SIZE]
+        conn.execute(update, [{'comment_id': comment_id, 'new_path': f"{comment_id:010d}/"} for comment_id in batch])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.drop_index('ix_comments_blog_id_path')
+        batch_op.drop_index('ix_comments_parent_id')
+        batch_op.drop_constraint('comments_parent_fk', type_='foreignkey')
+        batch_op.drop_column('depth')
+        batch_op.drop_column('path')
+        batch_op.drop_column('parent_id')
@@ -0,0 +1,36 @@
+"""Binary collation for comments.path
+
+Revision ID: 7b2d4e9c1a35
+Revises: e5b1c8d94f27
+Create Date: 2026-10-19 15:20:11.804417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2d4e9c1a35'
+down_revision: Union[str, None] = 'e5b1c8d94f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Databases that ran 5c1e7a9d3b02 before it set the collation got the database default,
+# under which locale-aware orderings skip "/" and subtree range scans miss replies.
+# SQLite compares bytes by default and needs nothing.
+BINARY_COLLATIONS = {'postgresql': 'C', 'mysql': 'utf8mb4_bin'}
+
+
+def upgrade() -> None:
+    collation = BINARY_COLLATIONS.get(op.get_context().dialect.name)
+    if collation:
+        op.alter_column('comments', 'path', existing_type=sa.String(length=255), existing_nullable=True,
+                        type_=sa.String(length=255, collation=collation))
+
+
+def downgrade() -> None:
+    collation = BINARY_COLLATIONS.get(op.get_context().dialect.name)
+    if collation:
+        op.alter_column('comments', 'path', existing_type=sa.String(length=255, collation=collation), existing_nullable=True,
+                        type_=sa.String(length=255))
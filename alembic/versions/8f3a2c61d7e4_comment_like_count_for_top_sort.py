@@ -0,0 +1,34 @@
+"""Denormalized like_count on comments for sort=top
+
+Revision ID: 8f3a2c61d7e4
+Revises: 5c1e7a9d3b02
+Create Date: 2026-10-19 10:03:27.118462
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a2c61d7e4'
+down_revision: Union[str, None] = '5c1e7a9d3b02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_comments_blog_id_like_count', ['blog_id', 'like_count', 'id'], unique=False)
+
+    op.execute(
+        "UPDATE comments SET like_count = "
+        "(SELECT COUNT(*) FROM comment_likes WHERE comment_likes.comment_id = comments.id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('comments') as batch_op:
+        batch_op.drop_index('ix_comments_blog_id_like_count')
+        batch_op.drop_column('like_count')
@@ -0,0 +1,29 @@
+"""Soft-delete flag on users for background account purges
+
+Revision ID: a64c0f1e9b27
+Revises: 3d7b9e2f4a10
+Create Date: 2026-10-19 15:02:44.871305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a64c0f1e9b27'
+down_revision: Union[str, None] = '3d7b9e2f4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_users_deleted_at', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_index('ix_users_deleted_at')
+        batch_op.drop_column('deleted_at')
@@ -0,0 +1,29 @@
+"""Generated image derivatives for profile pictures and cover photos
+
+Revision ID: e5b1c8d94f27
+Revises: a64c0f1e9b27
+Create Date: 2026-10-19 17:41:09.512873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1c8d94f27'
+down_revision: Union[str, None] = 'a64c0f1e9b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('profile_variants', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('cover_photo_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('cover_photo_variants')
+        batch_op.drop_column('profile_variants')
@@ -66,10 +66,34 @@ Gets detailed user profile.
 - **altId** (query): Optional user ID (default: current user)
 - **Returns**: Full profile with blogs/comments/follows
 """
+USER_GET_BATCH = """
+Gets several user profiles in one call.
+- **ids** (query): Comma-separated user IDs (max BATCH_MAX_IDS, default 100)
+- **Returns**: One entry per requested ID, in request order: {id, status_code, user, detail}
+- **Errors**: Per-id 404 inside the list; 400 for malformed or too many IDs
+"""
+USER_GET_STATS = """
+Gets profile counters for a user.
+- **user_id** (path): Target user ID
+- **Returns**: {user_id, followers, following, blogs, likes_received, comments}
+- **Notes**: Computed in one aggregate query and cached for a few seconds (USER_STATS_CACHE_SECONDS); blogs and likes count published blogs only
+"""
+USER_SEARCH = """
+Autocompletes usernames.
+- **prefix** (query): Start of the username; matching ignores case
+- **limit** (query): Max results (default 10)
+- **Returns**: List of {id, username, followers}
+- **Notes**: Exact match first, then by follower count. Served from an in-memory index; follower counts refresh every few minutes
+"""
+USER_GET_PURGES = """
+Lists deleted accounts whose content is still being purged (admin only).
+- **Returns**: List of {user_id, status, deleted, started_at, finished_at, error}
+- **Notes**: status is pending, running, done or failed; deleted counts rows removed per table by this worker
+"""
 USER_DELETE = """
 Deletes user account (irreversible).
 - **Returns**: Confirmation message
-- **Effects**: Removes user and all associated data
+- **Effects**: The account is disabled at once; its blogs, comments, likes and follows are purged in the background
 """
 USER_UPDATE = """
 Updates user profile.
@@ -99,7 +123,7 @@ Lists blogs filtered by tag.
 BLOG_GET_ALL = """
 Lists blogs with optional filters.
 - **user_id** (query): Filter by author ID
-- **Returns**: List of blogs (published only for non-admins)
+- **Returns**: List of blogs (published only for non-admins), each with `liked_by_me` for the caller
 """
 
 BLOG_GET_CURRENT_USER = """
@@ -114,6 +138,14 @@ Gets single blog post by ID.
 - **Notes**: Drafts only visible to owner/admin
 """
 
+BLOG_GET_BATCH = """
+Gets several blog posts in one call.
+- **ids** (query): Comma-separated blog IDs (max BATCH_MAX_IDS, default 100)
+- **Returns**: One entry per requested ID, in request order: {id, status_code, blog, detail}
+- **Notes**: Same visibility rules as GET /blog/{id}; drafts return a per-id 403
+- **Errors**: Per-id 404/403 inside the list; 400 for malformed or too many IDs
+"""
+
 BLOG_UPDATE = """
 Updates blog post (author/admin only).
 - **id** (path): Blog ID to update
@@ -135,7 +167,34 @@ COMMENT_CREATE = """
 Adds comment to a blog post.
 - **blog_id** (path): Target blog ID
 - **content** (body): Comment text
-- **Returns**: Created comment with timestamp
+- **parent_id** (body): Optional comment ID to reply to (same blog)
+- **Returns**: Created comment with timestamp, parent_id and depth
+- **Errors**: 404 if the blog or parent is missing, 400 if the thread is too deep
+"""
+
+COMMENT_GET_THREADS = """
+Lists top-level comments of a blog with their replies nested.
+- **blog_id** (path): Target blog ID
+- **limit** (query): Threads per page (default 20, max 100)
+- **after** (query): `next_cursor` from the previous page
+- **max_depth** (query): Reply levels to include (default: all)
+- **Returns**: {threads: [comment + replies], next_cursor}
+"""
+
+COMMENT_STREAM = """
+Live updates for a blog's comments and likes (Server-Sent Events).
+- **blog_id** (path): Target blog ID
+- **Returns**: text/event-stream with events comment.created, comment.updated, comment.deleted, comment.liked, comment.unliked, blog.liked, blog.unliked
+- **Notes**: A `: ping` comment is sent every SSE_HEARTBEAT_SECONDS while idle; a `resync` event means the client fell behind and should re-fetch the list
+- **Errors**: 503 when the worker is at SSE_MAX_SUBSCRIBERS
+"""
+
+COMMENT_GET_THREAD = """
+Gets one comment with its replies nested.
+- **comment_id** (path): Root comment ID
+- **max_depth** (query): Reply levels to include below the root (default: all)
+- **branches** (query): Only the first N direct replies and their subtrees
+- **Returns**: Comment with nested replies
 """
 
 COMMENT_LIKE = """
@@ -150,7 +209,9 @@ Lists comments for a blog.
 - **blog_id** (path): Target blog ID
 - **include_all** (query): Show all comments (admin only)
 - **author_id** (query): Filter by commenter
-- **Returns**: Paginated comment list
+- **sort** (query): `top` for the most-liked comments first
+- **limit** (query): Number of comments for sort=top (default 10, max 100)
+- **Returns**: Paginated comment list, each with `liked_by_me` for the caller
 """
 
 COMMENT_UPDATE = """
@@ -164,44 +225,69 @@ COMMENT_DELETE = """
 Deletes comment (owner/admin).
 - **comment_id** (path): Comment ID  
 - **Returns**: Confirmation
-- **Effects**: Removes from DB permanently
+- **Effects**: Removes the comment and all of its replies from DB permanently
 """
 
 
 # File Routes
 FILE_GET_PROFILE_PIC = """
 Gets the profile url from db
+- **size** (query, optional): Display size in pixels; returns the smallest WebP thumbnail at least that big (96, 256), else the original
 - **Returns**: {image_url: "https://..."}
 """
 
 FILE_GET_COVER_PHOTO = """
 Gets the cover_photo url from db
+- **size** (query, optional): Display width in pixels; returns the smallest WebP variant at least that wide (640, 1280), else the original
 - **Returns**: {image_url: "https://..."}
 """
 
 FILE_UPLOAD_PROFILE_PIC = """
-Uploads profile picture (replaces existing).
-- **file** (form-data): Image file (jpg/png < 5MB)
-- **Returns**: {image_url: "https://..."}
-- **Effects**: Deletes old picture from cloud
+Uploads profile picture (replaces existing) in the background.
+- **file** (form-data): Image file (jpg/png/gif/webp < 5MB)
+- **Returns**: 202 with the upload job {id, status, ...}; poll GET /files/uploads/{id}
+- **Effects**: Once stored, sets profile_url and profile_variants (96px and 256px square WebP thumbnails) and deletes the old picture from cloud
+- **Errors**: 413 if the request is over PROFILE_PIC_MAX_BYTES, 415 if the file isn't a JPEG/PNG/GIF/WebP; the job fails if the image can't be decoded
 """
 
 FILE_DELETE_PROFILE_PIC = """
 Removes user's profile picture.
-- **Effects**: Clears profile_url, deletes from cloud
+- **Effects**: Clears profile_url and its thumbnails, deletes from cloud
 - **Returns**: Confirmation message
 """
 
 FILE_UPLOAD_COVER_PHOTO = """
-Uploads cover photo (replaces existing).
-- **file** (form-data): Image file (jpg/png < 5MB)
-- **Returns**: {image_url: "https://..."}
-- **Effects**: Deletes old picture from cloud
+Uploads cover photo (replaces existing) in the background.
+- **file** (form-data): Image file (jpg/png/gif/webp < 5MB)
+- **Returns**: 202 with the upload job {id, status, ...}; poll GET /files/uploads/{id}
+- **Effects**: Once stored, sets cover_photo_url and cover_photo_variants (640px and 1280px wide WebP) and deletes the old photo from cloud
+- **Errors**: 413 if the request is over COVER_PHOTO_MAX_BYTES, 415 if the file isn't a JPEG/PNG/GIF/WebP; the job fails if the image can't be decoded
+"""
+
+FILE_GET_MEDIA = """
+Serves a file from the local media store (STORAGE_BACKEND=local). No authentication.
+- **name** (path): Content hash file name, as found at the end of a profile_url or cover_photo_url
+- **Returns**: The file; supports Range/If-Range requests and is cacheable forever
+"""
+
+FILE_COLLECT_MEDIA = """
+Finds stored files no user references any more and deletes them (admin only).
+- **dry_run** (query, default true): Only report; pass false to delete
+- **Returns**: {dry_run, started_at, finished_at, scanned, referenced, recent, orphaned, deleted, orphans}; orphans lists up to 100 URLs
+- **Notes**: Files newer than MEDIA_GC_GRACE_SECONDS are kept; the same job runs every MEDIA_GC_INTERVAL_SECONDS
+- **Errors**: 403 for non-admins, 409 if a collection is already running on this worker
+"""
+
+FILE_GET_UPLOAD = """
+Gets the status of one of your uploads.
+- **job_id** (path): ID returned by an upload endpoint
+- **Returns**: {id, user_id, kind, status, url, variants, error, created_at, finished_at}; status is queued, running, done or failed
+- **Notes**: Jobs are tracked by the worker process that accepted them and kept for an hour
 """
 
 FILE_DELETE_COVER_PHOTO = """
 Removes user's cover photo.
-- **Effects**: Clears cover_photo_url, deletes from cloud
+- **Effects**: Clears cover_photo_url and its variants, deletes from cloud
 - **Returns**: Confirmation message
 """
 
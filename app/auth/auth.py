@@ -8,12 +8,14 @@ from app.db.database import get_db
 from datetime import timedelta
 from app.db.models import User, RevokedToken
 from app.db import schemas
+from app.services.username_index import username_index
 
 from app.api_descriptions import AUTH_LOGIN, AUTH_REGISTER, AUTH_UPDATE_PASSWORD, AUTH_LOGOUT, AUTH_REFRESH, AUTH_GET_ME
 from app.auth.auth_utils import hash_password, verify_access_token, verify_password, get_current_user
 from app.auth.auth_utils import oauth2_scheme, create_token, authenticate_user, revoke_token
+from app.tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 # @router.post('/login')
 # def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
@@ -54,6 +56,7 @@ def register_user(request: schemas.UserCreate, db: Session = Depends(get_db)) ->
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
+        username_index.add(new_user.id, new_user.username)
 
         return new_user
     except (SQLAlchemyError, Exception) as e:
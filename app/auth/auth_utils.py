@@ -7,8 +7,9 @@ from app.utils import filter_user
 from app.config import settings
 from typing import List
 from app.db import schemas
-from app.db.database import get_db
+from app.db.database import get_db, SessionLocal
 from app.db.models import User, RevokedToken
+from app.tracing import span
 from sqlalchemy.orm import Session
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -32,7 +33,7 @@ def verify_access_token(token: str = Depends(oauth2_scheme)) -> dict:
         raise HTTPException(status_code=401, detail="Invalid token")
     
 def authenticate_user(db: Session, identifier: str, password: str):
-    user = db.query(User).filter((User.email == identifier) | (User.username == identifier)).first()
+    user = db.query(User).filter((User.email == identifier) | (User.username == identifier), User.deleted_at.is_(None)).first()
     if user is None or not verify_password(password, user.password):
         print("Authentication failed")
         return False
@@ -63,18 +64,19 @@ def revoke_token(db, refresh_token: str =Depends(oauth2_scheme)) -> RevokedToken
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> schemas.User:
     try:
-        payload = verify_access_token(token) 
-        user_id: int = payload.get("sub")
-        if not user_id:
-            print("No user_id specified")
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user_id = int(user_id)
-        current_user = filter_user(db, User.id == user_id).first()
-        if not current_user:
-            print("No user found in database")
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        return schemas.User.model_validate(current_user)
+        with span("auth"):
+            payload = verify_access_token(token) 
+            user_id: int = payload.get("sub")
+            if not user_id:
+                print("No user_id specified")
+                raise HTTPException(status_code=401, detail="Invalid token")
+            user_id = int(user_id)
+            current_user = filter_user(db, (User.id == user_id) & User.deleted_at.is_(None)).first()
+            if not current_user:
+                print("No user found in database")
+                raise HTTPException(status_code=401, detail="User not found")
+            
+            return schemas.User.model_validate(current_user)
     except JWTError as e:
         print(f"JWT Error: {e}")
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -87,4 +89,15 @@ def role_required(allowed_roles: List[str]):
                 detail=f"You do not have the required role(s). Allowed roles: {allowed_roles}",
             )
         return user
-    return role_check
\ No newline at end of file
+    return role_check
+
+def require_admin_token(authorization: str) -> schemas.User:
+    """Check an Authorization header value outside of dependency injection, e.g. in middleware."""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    db = SessionLocal()
+    try:
+        return role_required(["admin"])(get_current_user(token, db))
+    finally:
+        db.close()
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+from app.config import settings
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with per-entry expiry.
+
+    Entries live for `ttl` seconds; once `maxsize` is reached the oldest entry is evicted.
+    Each worker process has its own copy, so keep TTLs short for data other workers can change.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def values(self) -> List[Any]:
+        """Unexpired values, oldest first. Doesn't count as lookups."""
+        now = time.monotonic()
+        with self._lock:
+            return [value for expires, value in self._data.values() if expires > now]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Profile counters keyed by user id (UserService.get_user_stats)
+user_stats_cache = TTLCache(ttl=settings.USER_STATS_CACHE_SECONDS)
+
+# frozenset of followed ids keyed by follower id (FollowService.get_follow_status)
+followee_cache = TTLCache(ttl=settings.FOLLOWEE_CACHE_SECONDS)
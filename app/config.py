@@ -19,6 +19,62 @@ class Settings:
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30  ))
     cloudinary_url=os.getenv("CLOUDINARY_URL")
+    CLOUDINARY_CLOUD_NAME: str = os.getenv("CLOUDINARY_CLOUD_NAME")
+    CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY")
+    CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET")
+    CLOUDINARY_TAG: str = os.getenv("CLOUDINARY_TAG", "blog_api")  # marks uploads the media collector may delete
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "cloudinary")  # cloudinary, local or fake
+    MEDIA_ROOT: str = os.getenv("MEDIA_ROOT", "media")  # local backend only
+    MEDIA_URL: str = os.getenv("MEDIA_URL", "/files/media/")  # prefix of stored URLs for the local backend
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", 2))  # processes generating thumbnails
+    IMAGE_TIMEOUT_SECONDS: float = float(os.getenv("IMAGE_TIMEOUT_SECONDS", 30))
+    IMAGE_MAX_PIXELS: int = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+    IMAGE_WEBP_QUALITY: int = int(os.getenv("IMAGE_WEBP_QUALITY", 80))
+    UPLOAD_WORKERS: int = int(os.getenv("UPLOAD_WORKERS", 4))
+    UPLOAD_QUEUE_SIZE: int = int(os.getenv("UPLOAD_QUEUE_SIZE", 100))  # queued + running uploads per worker
+    UPLOAD_JOB_TTL_SECONDS: float = float(os.getenv("UPLOAD_JOB_TTL_SECONDS", 3600))
+    MEDIA_GC_INTERVAL_SECONDS: float = float(os.getenv("MEDIA_GC_INTERVAL_SECONDS", 24 * 3600))  # 0 disables the periodic run
+    MEDIA_GC_GRACE_SECONDS: float = float(os.getenv("MEDIA_GC_GRACE_SECONDS", 24 * 3600))  # never collect files younger than this
+    MEDIA_GC_BATCH_SIZE: int = int(os.getenv("MEDIA_GC_BATCH_SIZE", 500))
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", 0.01))  # share of requests traced
+    TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH")  # OTLP/JSON lines file; None disables export
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "blog-api")
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 1))  # sampling interval of ?__profile=1
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")  # per-logger overrides, e.g. "app.routers=WARNING,sqlalchemy.engine=INFO"
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+    LOG_FILE: str = os.getenv("LOG_FILE", "app.log")  # empty disables the file handler
+    LOG_ENDPOINT_SAMPLE_RATE: float = float(os.getenv("LOG_ENDPOINT_SAMPLE_RATE", 1))  # share of "endpoint has been called" lines kept
+    STATIC_DIR: str = os.getenv("STATIC_DIR", "static")
+    STATIC_BUILD_DIR: str = os.getenv("STATIC_BUILD_DIR", "build/static")  # output of python -m app.static_assets
+    UPLOAD_SPOOL_DIR: str = os.getenv("UPLOAD_SPOOL_DIR")  # None uses the system temp dir
+    PROFILE_PIC_MAX_BYTES: int = int(os.getenv("PROFILE_PIC_MAX_BYTES", 5 * 1024 * 1024))  # whole request body
+    COVER_PHOTO_MAX_BYTES: int = int(os.getenv("COVER_PHOTO_MAX_BYTES", 5 * 1024 * 1024))
+
+    BATCH_MAX_IDS: int = int(os.getenv("BATCH_MAX_IDS", 100))
+    FOLLOW_BULK_MAX_IDS: int = int(os.getenv("FOLLOW_BULK_MAX_IDS", 1000))
+    COMMENT_MAX_DEPTH: int = int(os.getenv("COMMENT_MAX_DEPTH", 20))  # path is String(255), 11 chars per level
+    COMMENT_THREADS_PAGE_SIZE: int = int(os.getenv("COMMENT_THREADS_PAGE_SIZE", 20))
+    TOP_COMMENTS_LIMIT: int = int(os.getenv("TOP_COMMENTS_LIMIT", 10))
+    USER_STATS_CACHE_SECONDS: float = float(os.getenv("USER_STATS_CACHE_SECONDS", 30))
+    FOLLOWEE_CACHE_SECONDS: float = float(os.getenv("FOLLOWEE_CACHE_SECONDS", 10))
+
+    SSE_HEARTBEAT_SECONDS: float = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+    SSE_QUEUE_SIZE: int = int(os.getenv("SSE_QUEUE_SIZE", 100))  # per subscriber, before it is told to resync
+    SSE_MAX_SUBSCRIBERS: int = int(os.getenv("SSE_MAX_SUBSCRIBERS", 10000))  # per worker
+
+    PURGE_BATCH_SIZE: int = int(os.getenv("PURGE_BATCH_SIZE", 500))  # rows per DELETE when purging a deleted account
+    PURGE_POLL_SECONDS: float = float(os.getenv("PURGE_POLL_SECONDS", 60))
+    PURGE_PROGRESS_RETENTION_SECONDS: float = float(os.getenv("PURGE_PROGRESS_RETENTION_SECONDS", 24 * 3600))  # how long GET /user/purges lists finished purges
+
+    FOLLOW_GRAPH_ENABLED: bool = os.getenv("FOLLOW_GRAPH_ENABLED", "true").lower() == "true"
+    FOLLOW_GRAPH_REFRESH_SECONDS: float = float(os.getenv("FOLLOW_GRAPH_REFRESH_SECONDS", 300))  # picks up other workers' follows
+    FOLLOW_SUGGESTIONS_LIMIT: int = int(os.getenv("FOLLOW_SUGGESTIONS_LIMIT", 20))
+
+    USER_SEARCH_ENABLED: bool = os.getenv("USER_SEARCH_ENABLED", "true").lower() == "true"
+    USER_SEARCH_REFRESH_SECONDS: float = float(os.getenv("USER_SEARCH_REFRESH_SECONDS", 300))  # also refreshes follower-count ranking
+    USER_SEARCH_LIMIT: int = int(os.getenv("USER_SEARCH_LIMIT", 10))
+    USER_SEARCH_MAX_LIMIT: int = int(os.getenv("USER_SEARCH_MAX_LIMIT", 50))
 
 
 settings = Settings()
\ No newline at end of file
@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Index, UniqueConstraint, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.db.database import Base
@@ -11,12 +11,15 @@ class User(Base):
     job_description = Column(String(255), nullable=True)
     profile_url = Column(String(255), nullable=True)
     cover_photo_url = Column(String(255), nullable=True)
+    profile_variants = Column(JSON, nullable=True)  # {"sm": url, "md": url}, see app/images.py
+    cover_photo_variants = Column(JSON, nullable=True)
     username = Column(String(255), nullable=False)
     email = Column(String(255), nullable=False, unique=True)
     created_at = Column(DateTime, index=True, default=lambda: datetime.now(timezone.utc))
     bio = Column(Text, nullable=True)
     password = Column(String(255), nullable=False)
     role = Column(String(255), nullable=False, server_default='reader')
+    deleted_at = Column(DateTime, nullable=True, index=True)  # soft delete; AccountPurger removes the rows
     blogs = relationship("Blog", back_populates="author", cascade="all, delete-orphan")
     followers = relationship("Follow", foreign_keys="[Follow.followed_id]", back_populates="followed", cascade="all, delete-orphan")
     following = relationship("Follow", foreign_keys="[Follow.follower_id]", back_populates="follower", cascade="all, delete-orphan")
@@ -58,6 +61,11 @@ class BlogLike(Base):
 
 class Follow(Base):
     __tablename__ = 'follows'
+    # "does A follow B" and "A's followees" are answered from the unique index alone
+    __table_args__ = (
+        UniqueConstraint('follower_id', 'followed_id', name='uq_follows_follower_id_followed_id'),
+        Index('ix_follows_followed_id', 'followed_id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     follower_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
     followed_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
@@ -68,11 +76,31 @@ class Follow(Base):
     def __repr__(self):
         return f"<Follow(id={self.id}, follower_id={self.follower_id}, followed_id={self.followed_id})>"
 
+# Comment paths must compare byte by byte for the subtree ranges of CommentService to
+# hold; locale collations such as PostgreSQL's en_US.UTF-8 ignore "/" when ordering.
+# SQLite compares bytes already.
+COMMENT_PATH_TYPE = (
+    String(255)
+    .with_variant(String(255, collation="C"), "postgresql")
+    .with_variant(String(255, collation="utf8mb4_bin"), "mysql")
+)
+
+
 class Comment(Base):
     __tablename__ = 'comments'
+    # Threads are fetched as a range over (blog_id, path), see CommentService.get_thread;
+    # sort=top walks (blog_id, like_count, id) backwards and stops after N rows
+    __table_args__ = (
+        Index('ix_comments_blog_id_path', 'blog_id', 'path'),
+        Index('ix_comments_blog_id_like_count', 'blog_id', 'like_count', 'id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     author_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), index=True)
     blog_id = Column(Integer, ForeignKey('blogs.id', ondelete="CASCADE"), nullable=False, index=True)
+    parent_id = Column(Integer, ForeignKey('comments.id', ondelete="CASCADE"), nullable=True, index=True)
+    path = Column(COMMENT_PATH_TYPE, nullable=True)  # materialized path: zero-padded ancestor ids + own id, e.g. "0000000003/0000000017/"
+    depth = Column(Integer, nullable=False, default=0, server_default='0')
+    like_count = Column(Integer, nullable=False, default=0, server_default='0')  # kept in step with comment_likes by like/unlike
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, index=True, default=lambda: datetime.now(timezone.utc))
     likes = relationship("CommentLike", back_populates="comment", cascade="all, delete-orphan")
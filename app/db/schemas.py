@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, field_validator
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -78,12 +78,20 @@ class Blog(BlogBase):
     tag: Optional[str] = None
     like_count: Optional[int] = 0
     comment_count: Optional[int] = 0
+    liked_by_me: Optional[bool] = None  # only resolved on list responses for authenticated callers
 
     class Config:
         from_attributes = True  # Tells Pydantic to treat SQLAlchemy models like dicts
         extra = "forbid"
 
 
+class BlogBatchItem(BaseModel):  # one entry per requested id, in request order
+    id: int
+    status_code: int
+    blog: Optional[Blog] = None
+    detail: Optional[str] = None
+
+
 # Pydantic Schema for User
 class UserBase(BaseModel):
     username: str
@@ -115,11 +123,17 @@ class UserSummary(BaseModel):
     created_at: datetime
     job_description: Optional[str] = None
     profile_url: Optional[str] = None
+    profile_variants: Optional[Dict[str, str]] = None  # small avatars for lists
 
     class Config:
         from_attributes = True
 
 
+class FollowSuggestion(BaseModel):
+    user: UserSummary
+    mutual_count: int  # how many of the caller's followees follow this user
+
+
 class User(UserBase):
     id: int
     role: str
@@ -127,6 +141,8 @@ class User(UserBase):
     job_description: Optional[str] = None
     profile_url: Optional[str] = None
     cover_photo_url: Optional[str] = None
+    profile_variants: Optional[Dict[str, str]] = None
+    cover_photo_variants: Optional[Dict[str, str]] = None
     created_at: datetime
 
     blogs: List[BlogSummary] = []
@@ -135,6 +151,61 @@ class User(UserBase):
         from_attributes = True
 
 
+class UserStats(BaseModel):
+    user_id: int
+    followers: int
+    following: int
+    blogs: int  # published only
+    likes_received: int  # likes on the user's published blogs
+    comments: int
+
+
+class UserSearchResult(BaseModel):
+    id: int
+    username: str
+    followers: int
+
+
+class AccountPurgeStatus(BaseModel):
+    user_id: int
+    status: str  # pending, running, done or failed
+    deleted: Dict[str, int] = {}
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class MediaGCReport(BaseModel):
+    dry_run: bool
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    scanned: int = 0  # files listed by the storage backend
+    referenced: int = 0  # distinct files referenced by live users
+    recent: int = 0  # unreferenced but inside the grace period
+    orphaned: int = 0
+    deleted: int = 0
+    orphans: List[str] = []  # sample of orphan URLs
+
+
+class UploadJob(BaseModel):
+    id: str
+    user_id: int
+    kind: str  # profile_pic or cover_photo
+    status: str  # queued, running, done or failed
+    url: Optional[str] = None
+    variants: Optional[Dict[str, str]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class UserBatchItem(BaseModel):
+    id: int
+    status_code: int
+    user: Optional[UserSummary] = None
+    detail: Optional[str] = None
+
+
 class FollowBase(BaseModel):
     pass
 
@@ -152,6 +223,22 @@ class Unfollow(FollowBase):
     class Config:
         from_attributes = True
 
+class BulkFollow(BaseModel):
+    user_ids: List[int]
+
+class BulkFollowResult(BaseModel):
+    followed: List[int] = []
+    already_following: List[int] = []
+    not_found: List[int] = []
+
+class BulkUnfollowResult(BaseModel):
+    unfollowed: List[int] = []
+    not_following: List[int] = []
+
+class FollowStatus(BaseModel):  # one entry per requested id, in request order
+    id: int
+    following: bool
+
 
 class CommentBase(BaseModel):
     content: str
@@ -163,15 +250,27 @@ class GetComment(CommentBase):
     id: int
     author_id: int
     blog_id: int
+    parent_id: Optional[int] = None
+    depth: int = 0
     created_at: datetime
     likes_count: Optional[int] = 0
+    liked_by_me: Optional[bool] = None
 
     class Config:
         from_attributes = True
 
 
+class CommentNode(GetComment):  # a comment with its (depth-limited) replies nested under it
+    replies: List["CommentNode"] = []
+
+
+class CommentThreadPage(BaseModel):
+    threads: List[CommentNode]
+    next_cursor: Optional[str] = None  # pass back as ?after= to get the next page of top-level threads
+
+
 class CreateComment(CommentBase):
-    pass
+    parent_id: Optional[int] = None  # reply to this comment instead of the blog
 
 class CommentUpdate(CommentBase):
     pass
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from itertools import count
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriberLimitReached(Exception):
+    pass
+
+
+class EventBroker:
+    """
+    In-process pub/sub feeding the Server-Sent Events streams.
+
+    Subscribers are asyncio queues owned by the event loop. Services run in the
+    threadpool, so `publish` hands the event to the loop with `call_soon_threadsafe`
+    and each event is serialized once, however many clients are listening.
+    """
+
+    def __init__(self, queue_size: int = settings.SSE_QUEUE_SIZE, max_subscribers: int = settings.SSE_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._topics: Dict[Any, Set[asyncio.Queue]] = defaultdict(set)
+        self._subscriber_count = 0
+        self._event_ids = count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._subscriber_count
+
+    def subscribe(self, topic) -> asyncio.Queue:
+        # Must be called from the event loop
+        if self._subscriber_count >= self.max_subscribers:
+            raise SubscriberLimitReached()
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._topics[topic].add(queue)
+        self._subscriber_count += 1
+        return queue
+
+    def unsubscribe(self, topic, queue: asyncio.Queue):
+        subscribers = self._topics.get(topic)
+        if subscribers and queue in subscribers:
+            subscribers.discard(queue)
+            self._subscriber_count -= 1
+            if not subscribers:
+                del self._topics[topic]
+
+    def publish(self, topic, event: str, data: dict):
+        """Safe to call from any thread; a no-op until someone has subscribed."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        message = f"id: {next(self._event_ids)}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        loop.call_soon_threadsafe(self._fan_out, topic, message)
+
+    def _fan_out(self, topic, message: str):
+        lagging = 0
+        for queue in self._topics.get(topic, ()):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Backpressure: a client that can't keep up loses its backlog and is told to re-fetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait("event: resync\ndata: {}\n\n")
+                lagging += 1
+        if lagging:
+            logger.warning("%s SSE subscriber(s) on %s fell behind, backlog dropped", lagging, topic)
+
+    async def stream(self, topic, heartbeat: float = settings.SSE_HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+        """Yield SSE messages for `topic`, with a comment line as heartbeat while idle."""
+        try:
+            queue = self.subscribe(topic)
+        except SubscriberLimitReached:
+            # Lost the race against the route's capacity check; ask the client to poll instead
+            yield "event: error\ndata: {\"detail\": \"Too many live subscribers\"}\n\n"
+            return
+        try:
+            yield f"retry: {int(heartbeat * 1000)}\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            self.unsubscribe(topic, queue)
+
+
+# Topics are blog ids: comment and like activity on a blog goes to that blog's stream
+broker = EventBroker()
@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from app.config import settings
+
+# Derivatives generated for each upload kind: name -> edge in pixels. Avatars are
+# square-cropped (drawn as circles); cover photos keep their aspect ratio and are sized by width.
+VARIANTS = {
+    "profile_pic": {"sm": 96, "md": 256},
+    "cover_photo": {"sm": 640, "md": 1280},
+}
+
+# Leading bytes of the formats accepted for upload
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """The MIME type of an image from its first 12 bytes, or None if it isn't JPEG, PNG, GIF or WebP."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def render_variants(path: str, kind: str) -> Dict[str, str]:
+    """
+    Decode the image at `path` and write its WebP derivatives to temp files.
+
+    Runs in the image process pool, so it only touches the filesystem.
+
+    Returns:
+        Dict[str, str]: Variant name -> temp file path; the caller removes the files.
+
+    Raises:
+        ValueError: If the file is not an image Pillow can read.
+    """
+    # Only the pool's processes decode images, so only they import Pillow
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS  # refuse decompression bombs
+    try:
+        opened = Image.open(path)
+    except UnidentifiedImageError:
+        raise ValueError("File is not a supported image") from None
+    with opened as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        outputs = {}
+        for name, edge in VARIANTS[kind].items():
+            if kind == "profile_pic":
+                variant = ImageOps.fit(image, (edge, edge), Image.LANCZOS)
+            else:
+                variant = image.copy()
+                variant.thumbnail((edge, edge * 10), Image.LANCZOS)  # never upscales
+            with tempfile.NamedTemporaryFile(prefix=f"{name}-", suffix=".webp", dir=settings.UPLOAD_SPOOL_DIR, delete=False) as out:
+                variant.save(out, "WEBP", quality=settings.IMAGE_WEBP_QUALITY, method=4)
+                outputs[name] = out.name
+        return outputs
+
+
+def pick_variant(original: Optional[str], variants: Optional[Dict[str, str]], kind: str, size: Optional[int]) -> Optional[str]:
+    """The smallest stored variant at least `size` pixels across, else the original."""
+    if size is None or not variants:
+        return original
+    for name, edge in sorted(VARIANTS[kind].items(), key=lambda item: item[1]):
+        if edge >= size and name in variants:
+            return variants[name]
+    return original
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def image_pool() -> ProcessPoolExecutor:
+    # Created on first upload. Spawned, not forked: the server process is multi-threaded.
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_image_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -1,6 +1,104 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+from datetime import datetime, timezone
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.config import settings
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, `extra` fields and the traceback, if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class EndpointCallSampler(logging.Filter):
+    """Keeps `rate` of the "... endpoint has been called" INFO lines that routers log on every request."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1 or record.levelno != logging.INFO or "endpoint has been called" not in str(record.msg):
+            return True
+        return random.random() < self.rate
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now, as they may change once the caller moves on, but
+        # unlike QueueHandler keep the traceback apart from the message for JsonFormatter
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(raw: str) -> Dict[str, str]:
+    """`app.routers=WARNING,sqlalchemy.engine=INFO` -> {"app.routers": "WARNING", ...}"""
+    levels = {}
+    for part in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, level = part.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
 
 def setup_logging():
+    """
+    Configure the console and file handlers, then move them behind a queue.
+
+    Request threads only put records on the queue; a listener thread formats and
+    writes them, so disk writes and file rotation never block a request.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    formatter = "json" if settings.LOG_FORMAT == "json" else "default"
+    handlers = {
+        "console": {
+            "class": "logging.StreamHandler",
+            "formatter": formatter,
+        },
+    }
+    if settings.LOG_FILE:
+        handlers["file"] = {
+            "class": "logging.handlers.RotatingFileHandler",
+            "formatter": formatter,
+            "filename": settings.LOG_FILE,
+            "maxBytes": 10485760,  # 10 MB
+            "backupCount": 5,     # Keep 5 backup files
+        }
     logging_config = {
         "version": 1,
         "disable_existing_loggers": False,
@@ -8,23 +106,33 @@ def setup_logging():
             "default": {
                 "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
             },
-        },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "formatter": "default",
-            },
-            "file": {
-                "class": "logging.handlers.RotatingFileHandler",
-                "formatter": "default",
-                "filename": "app.log",
-                "maxBytes": 10485760,  # 10 MB
-                "backupCount": 5,     # Keep 5 backup files
+            "json": {
+                "()": JsonFormatter,
             },
         },
+        "handlers": handlers,
+        "loggers": {name: {"level": level} for name, level in parse_levels(settings.LOG_LEVELS).items()},
         "root": {
-            "level": "INFO",
-            "handlers": ["console", "file"],
+            "level": settings.LOG_LEVEL,
+            "handlers": list(handlers),
         },
     }
-    dictConfig(logging_config)
\ No newline at end of file
+    dictConfig(logging_config)
+
+    root = logging.getLogger()
+    targets = root.handlers[:]
+    for handler in targets:
+        root.removeHandler(handler)
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(EndpointCallSampler(settings.LOG_ENDPOINT_SAMPLE_RATE))
+    root.addHandler(queue_handler)
+    _listener = QueueListener(log_queue, *targets, respect_handler_level=True)
+    _listener.start()
+
+
+@atexit.register
+def _flush():
+    # Writes out whatever is still queued
+    if _listener is not None:
+        _listener.stop()
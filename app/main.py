@@ -1,21 +1,31 @@
 from fastapi import FastAPI, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from fastapi.staticfiles import StaticFiles
 from app.auth.auth import router as auth_router
 from app.routers.blog.blog import router as blog_router
 from app.routers.user.user import router as user_router
 from app.routers.follow.follow import router as follow_router
 from app.routers.comments.coments import router as comments_router
-from app.routers.files.files import router as files_router
+from app.routers.files.files import router as files_router, media_router
 from app.db.database import get_db
-import os
-import cloudinary
-from dotenv import load_dotenv
-from pathlib import Path
 from app.config import settings
 from fastapi.middleware.cors import CORSMiddleware
 from app.logging_config import setup_logging
+from app.middleware import BodySizeLimitMiddleware
+from app.static_assets import AssetStaticFiles
+from app.metrics import MetricsMiddleware, router as metrics_router
+from app.tracing import TracingMiddleware
+from app.profiling import ProfilerMiddleware
+from app.auth.auth_utils import require_admin_token
+from app.services.follow_graph import follow_graph
+from app.services.follow_service import load_follow_edges
+from app.services.username_index import username_index
+from app.services.user_service import load_username_rows
+from app.services.account_purge import account_purger
+from app.services.upload_jobs import upload_queue
+from app.services.media_gc import media_collector
+from app.images import shutdown_image_pool
+from app.db.database import SessionLocal
 import logging
 # models.Base.metadata.create_all(bind=engine)
 
@@ -29,7 +39,7 @@ except Exception as e:
 
 app = FastAPI(title=settings.PROJECT_NAME, version=settings.PROJECT_VERSION, description=settings.PROJECT_DESCRIPTION)
 
-app.mount("/static", StaticFiles(directory="static"), name="/static")
+app.mount("/static", AssetStaticFiles(), name="/static")
 
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(blog_router, prefix="/blog", tags=["blog"])
@@ -37,6 +47,8 @@ app.include_router(user_router, prefix="/user", tags=["user"])
 app.include_router(follow_router, prefix="/follow", tags=["follow"])
 app.include_router(comments_router, prefix="/comments")
 app.include_router(files_router, prefix="/files", tags=["files"])
+app.include_router(media_router, prefix="/files/media", tags=["files"])
+app.include_router(metrics_router)
 
 origins = [
     "http://localhost:3000",
@@ -45,6 +57,14 @@ origins = [
     "https://localhost:8000"
 ]
 
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        "/files/upload-profile-pic": settings.PROFILE_PIC_MAX_BYTES,
+        "/files/upload-cover-photo": settings.COVER_PHOTO_MAX_BYTES,
+    },
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -53,16 +73,40 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-logger.info("Loading environment variables...")
-env_path = Path('.') / '.env'
-load_dotenv(dotenv_path=env_path)
+app.add_middleware(ProfilerMiddleware, authorize=require_admin_token)
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so the timings include the other middleware
+app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event("startup")
+def start_in_memory_indexes():
+    if settings.FOLLOW_GRAPH_ENABLED:
+        logger.info("Loading follow graph in the background...")
+        follow_graph.start(load_follow_edges)
+    if settings.USER_SEARCH_ENABLED:
+        logger.info("Loading username index in the background...")
+        username_index.start(load_username_rows)
+
+
+@app.on_event("shutdown")
+def drain_upload_queue():
+    upload_queue.shutdown()
+    shutdown_image_pool()
+
+
+@app.on_event("startup")
+def start_account_purger():
+    # Also resumes purges interrupted by a crash or restart
+    account_purger.start(SessionLocal)
+
+
+@app.on_event("startup")
+def start_media_collector():
+    if settings.MEDIA_GC_INTERVAL_SECONDS > 0:
+        media_collector.start(SessionLocal)
 
 
 @app.get('/')
@@ -79,7 +123,7 @@ def index(db: Session = Depends(get_db)):  # Inject db session
         }
         
     except Exception as e:
-        logger.error(f"Database health check failed: {str(e)}")
+        logger.error("Database health check failed: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Database health check failed: {str(e)}"
@@ -0,0 +1,134 @@
+import time
+from contextvars import ContextVar
+
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+
+from app.cache import followee_cache, user_stats_cache
+from app.db.database import engine
+from app.services.upload_jobs import upload_queue
+
+# Route template of the request being served, for labelling its database statements
+current_route: ContextVar[str] = ContextVar("current_route", default="none")
+
+REQUESTS = Counter("http_requests_total", "HTTP requests served.", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to serve HTTP requests.", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+IN_FLIGHT = Gauge("http_requests_in_progress", "HTTP requests being served.", ["method", "route"])
+DB_STATEMENTS = Counter("db_statements_total", "SQL statements executed.", ["route", "operation"])
+DB_LATENCY = Histogram(
+    "db_statement_duration_seconds", "Time to execute SQL statements.", ["route", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def route_template(scope) -> str:
+    """The path template of the route a request goes to, so labels don't grow with ids in URLs."""
+    # Only the path regex and method, in routing order: Route.matches() also builds the
+    # child scope and costs about 2us a route
+    path, method = scope["path"], scope["method"]
+    partial = None
+    for route in scope["app"].router.routes:
+        if route.path_regex.match(path):
+            methods = getattr(route, "methods", None)  # None on mounts
+            if methods is None or method in methods:
+                return route.path
+            if partial is None:
+                partial = route.path  # right path, wrong method: answered with 405
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """Counts and times HTTP requests per method and route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], route_template(scope)
+        token = current_route.set(route)
+        status = 500
+        in_flight = IN_FLIGHT.labels(method, route)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            REQUESTS.labels(method, route, str(status)).inc()
+            in_flight.dec()
+            current_route.reset(token)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    labels = (current_route.get(), operation if operation in _OPERATIONS else "OTHER")
+    DB_STATEMENTS.labels(*labels).inc()
+    DB_LATENCY.labels(*labels).observe(time.perf_counter() - context._metrics_start)
+
+
+class _StateCollector:
+    """Reads connection pool, cache and upload queue state when scraped."""
+
+    caches = {"user_stats": user_stats_cache, "followee": followee_cache}
+
+    def collect(self):
+        pool = engine.pool
+        for name, documentation in (
+            ("size", "Connections the pool keeps open."),
+            ("checkedin", "Idle connections in the pool."),
+            ("checkedout", "Connections in use."),
+            ("overflow", "Connections opened beyond the pool size."),
+        ):
+            count = getattr(pool, name, None)
+            if callable(count):  # not every pool class keeps these counts; SingletonThreadPool.size is a plain int
+                yield GaugeMetricFamily(f"db_pool_{name}", documentation, value=count())
+
+        hits = CounterMetricFamily("cache_hits", "Cache lookups answered from the cache.", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache lookups that missed.", labels=["cache"])
+        entries = GaugeMetricFamily("cache_entries", "Entries held, including expired ones not yet evicted.", labels=["cache"])
+        for name, cache in self.caches.items():
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+            entries.add_metric([name], len(cache))
+        yield from (hits, misses, entries)
+
+        # Job records are looked up by id, not cached, so they get their own gauge
+        jobs = GaugeMetricFamily("upload_jobs", "Upload jobs on record in this worker, by status.", labels=["status"])
+        for status, count in upload_queue.status_counts().items():
+            jobs.add_metric([status], count)
+        yield jobs
+
+
+REGISTRY.register(_StateCollector())
+
+router = APIRouter()
+
+
+@router.get('/metrics', include_in_schema=False)
+def metrics():
+    # Per worker process, like the in-memory caches
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,183 @@
+import html
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+
+from app.config import settings
+
+FORMATS = ("collapsed", "html")
+
+
+class ProfileSession:
+    """
+    Samples the stacks of the threads serving one request every `interval` seconds.
+
+    Threads register themselves through `profiled_thread()` while they run the
+    request's endpoint, so other requests sharing the worker don't show up.
+    """
+
+    def __init__(self, interval: float = settings.PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.threads: Dict[int, int] = {}  # thread id -> nesting depth
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._root = os.getcwd() + os.sep
+        self._labels: Dict[object, str] = {}  # code object -> frame label
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            path = path[len(self._root):] if path.startswith(self._root) else path.rsplit("site-packages" + os.sep, 1)[-1]
+            label = self._labels[code] = f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.threads):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                if stack:
+                    self.samples[tuple(reversed(stack))] += 1
+
+    def enter(self):
+        thread_id = threading.get_ident()
+        self.threads[thread_id] = self.threads.get(thread_id, 0) + 1
+
+    def leave(self):
+        thread_id = threading.get_ident()
+        self.threads[thread_id] -= 1
+        if not self.threads[thread_id]:
+            del self.threads[thread_id]
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def collapsed(self) -> str:
+        """One `frame;frame;frame count` line per distinct stack, for flamegraph.pl or speedscope."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def flame_graph(self, title: str) -> str:
+        """A self-contained HTML icicle graph: callers above callees, widths proportional to samples."""
+        tree = {"count": 0, "children": {}}
+        for stack, count in self.samples.items():
+            tree["count"] += count
+            node = tree
+            for frame in stack:
+                node = node["children"].setdefault(frame, {"count": 0, "children": {}})
+                node["count"] += count
+
+        def render(name: str, node: dict, parent_count: int) -> str:
+            children = "".join(render(child, grandchild, node["count"]) for child, grandchild in sorted(node["children"].items(), key=lambda item: -item[1]["count"]))
+            label = html.escape(f"{name} — {node['count']} samples, {node['count'] * self.interval * 1000:.0f} ms")
+            return (
+                f'<div class="node" style="width:{100 * node["count"] / parent_count:.3f}%">'
+                f'<div class="frame" title="{label}">{label}</div><div class="children">{children}</div></div>'
+            )
+
+        body = render("all", tree, tree["count"]) if tree["count"] else "<p>No samples: the request finished within one sampling interval.</p>"
+        return (
+            f"<!doctype html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title><style>"
+            "body{font:12px monospace;margin:8px}.children{display:flex}.node{box-sizing:border-box;min-width:0}"
+            ".frame{background:#f4a261;border:1px solid #fff;padding:2px;overflow:hidden;white-space:nowrap;text-overflow:ellipsis}"
+            f"</style></head><body><h3>{html.escape(title)}</h3>{body}</body></html>"
+        )
+
+
+_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+@contextmanager
+def profiled_thread():
+    """Have the current thread sampled while the enclosed block runs, if the request is being profiled."""
+    session = _session.get()
+    if session is None:
+        yield
+        return
+    session.enter()
+    try:
+        yield
+    finally:
+        session.leave()
+
+
+def _requested_format(scope) -> Optional[str]:
+    value = dict(scope["headers"]).get(b"x-profile", b"").decode("latin-1")
+    if not value and b"__profile" in scope["query_string"]:
+        value = parse_qs(scope["query_string"].decode("latin-1")).get("__profile", [""])[0]
+    if not value or value == "0":
+        return None
+    return value if value in FORMATS else "html"
+
+
+class ProfilerMiddleware:
+    """
+    Profiles a single request when an admin asks for it with `?__profile=1` or an
+    `X-Profile` header. The value picks the report: `html` (the default) or
+    `collapsed`. The report replaces the response body; the endpoint's own status
+    code is returned in `X-Profiled-Status`.
+
+    `authorize` is called with the Authorization header in the threadpool and raises
+    HTTPException to refuse.
+    """
+
+    def __init__(self, app, authorize: Callable[[str], object]):
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        report_format = _requested_format(scope) if scope["type"] == "http" else None
+        if report_format is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await run_in_threadpool(self.authorize, dict(scope["headers"]).get(b"authorization", b"").decode("latin-1"))
+        except HTTPException as e:
+            await JSONResponse({"detail": e.detail}, status_code=e.status_code)(scope, receive, send)
+            return
+
+        status = 500
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        session = ProfileSession()
+        token = _session.set(session)
+        session.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            session.stop()
+            _session.reset(token)
+
+        headers = {"X-Profiled-Status": str(status), "Cache-Control": "no-store"}
+        if report_format == "collapsed":
+            response = PlainTextResponse(session.collapsed(), headers=headers)
+        else:
+            title = f"{scope['method']} {scope['path']}: {elapsed_ms:.1f} ms, status {status}"
+            response = HTMLResponse(session.flame_graph(title), headers=headers)
+        await response(scope, receive, send)
@@ -1,17 +1,19 @@
 import logging
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.db.database import get_db
 from app.db import schemas
 from app.services.blog_service import BlogService
 from app.auth.auth_utils import get_current_user, role_required
-from app.api_descriptions import BLOG_CREATE, BLOG_GET_BY_TAG, BLOG_GET_ALL, BLOG_GET_BY_ID, BLOG_UPDATE, BLOG_GET_CURRENT_USER, BLOG_DELETE
+from app.utils import parse_id_list, parse_fields, sparse_response
+from app.api_descriptions import BLOG_CREATE, BLOG_GET_BY_TAG, BLOG_GET_ALL, BLOG_GET_BY_ID, BLOG_UPDATE, BLOG_GET_CURRENT_USER, BLOG_DELETE, BLOG_GET_BATCH
+from app.tracing import TracedRoute
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(dependencies= [Depends(get_current_user)])
+router = APIRouter(route_class=TracedRoute, dependencies=[Depends(get_current_user)])
 
 def get_blog_service(require_user: bool = False):
     """
@@ -36,35 +38,45 @@ def create_blog(request: schemas.BlogCreate, service: BlogService = Depends(get_
     return service.create_blog(request)
 
 @router.get('/', status_code=status.HTTP_200_OK, description=BLOG_GET_ALL)
-def get_all_blogs(user_id: Optional[int] = None, service: BlogService = Depends(get_blog_service(True))) -> List[schemas.Blog]:
+def get_all_blogs(user_id: Optional[int] = None, fields: Optional[str] = None, service: BlogService = Depends(get_blog_service(True))) -> List[schemas.Blog]:
     logger.info("get_all_blogs endpoint has been called")
-    return service.get_all_blogs(user_id)
+    selected = parse_fields(fields, schemas.Blog)
+    return sparse_response(service.get_all_blogs(user_id, selected), selected)
   
     
 @router.get('/current', status_code=status.HTTP_200_OK, response_model= List[schemas.Blog], dependencies=[Depends(role_required(['admin', 'author']))], description=BLOG_GET_CURRENT_USER)
-def get_current_user_blogs(service: BlogService = Depends(get_blog_service(True))) -> List[schemas.Blog]:
+def get_current_user_blogs(fields: Optional[str] = None, service: BlogService = Depends(get_blog_service(True))) -> List[schemas.Blog]:
     logger.info("get_current_user_blogs endpoint has been called")
-    return service.get_current_user_blogs()
+    selected = parse_fields(fields, schemas.Blog)
+    return sparse_response(service.get_current_user_blogs(selected), selected)
+
+
+@router.get('/batch', status_code=status.HTTP_200_OK, description=BLOG_GET_BATCH)
+def get_blogs_by_ids(ids: str = Query(...), service: BlogService = Depends(get_blog_service(True))) -> List[schemas.BlogBatchItem]:
+    logger.info("get_blogs_by_ids endpoint has been called with ids: %s", ids)
+    return service.get_blogs_by_ids(parse_id_list(ids))
 
 
 @router.get('/{id}', status_code=status.HTTP_200_OK, response_model=schemas.Blog, description=BLOG_GET_BY_ID)
-def get_blog_by_id(id: int, service: BlogService = Depends(get_blog_service(True))):
-    logger.info(f"get_blog_by_id endpoint has been called with id: {id}")
-    return service.get_blog_by_id(id)
+def get_blog_by_id(id: int, fields: Optional[str] = None, service: BlogService = Depends(get_blog_service(True))):
+    logger.info("get_blog_by_id endpoint has been called with id: %s", id)
+    selected = parse_fields(fields, schemas.Blog)
+    return sparse_response(service.get_blog_by_id(id, selected), selected)
 
 @router.put('/{id}', status_code=status.HTTP_200_OK, description=BLOG_UPDATE, dependencies=[Depends(role_required(['author']))])
 def update_blog(request: schemas.BlogUpdate, id: int, service: BlogService = Depends(get_blog_service(True))):
-    logger.info(f"update_blog endpoint has been called with id: {id}")
+    logger.info("update_blog endpoint has been called with id: %s", id)
     return service.update_blog(request, id)
 
 
 @router.delete('/{id}', status_code=status.HTTP_202_ACCEPTED, description=BLOG_DELETE, dependencies=[Depends(role_required(['admin', 'author']))])
 def delete_blog(id: int, service: BlogService = Depends(get_blog_service(True))):
-    logger.info(f"delete_blog endpoint has been called with id: {id}")
+    logger.info("delete_blog endpoint has been called with id: %s", id)
     return service.delete_blog(id)
 
 
 @router.get('/tag/{tag}', status_code=status.HTTP_200_OK, description=BLOG_GET_BY_TAG)
-def sort_by_tag(tag: str, service: BlogService = Depends(get_blog_service(False))) -> List[schemas.BlogSummary]:
-    logger.info(f"sort_by_tag endpoint has been called with tag: {tag}")
-    return service.sort_by_tag(tag)
+def sort_by_tag(tag: str, fields: Optional[str] = None, service: BlogService = Depends(get_blog_service(False))) -> List[schemas.BlogSummary]:
+    logger.info("sort_by_tag endpoint has been called with tag: %s", tag)
+    selected = parse_fields(fields, schemas.BlogSummary)
+    return sparse_response(service.sort_by_tag(tag, selected), selected)
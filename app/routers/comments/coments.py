@@ -1,17 +1,23 @@
 from email.policy import HTTP
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.db.database import get_db
 from app.db import schemas
 from app.auth.auth_utils import get_current_user
-from app.api_descriptions import COMMENT_LIKE, COMMENT_CREATE, COMMENT_DELETE, COMMENT_UPDATE, COMMENT_GET_ALL
+from app.api_descriptions import COMMENT_LIKE, COMMENT_CREATE, COMMENT_DELETE, COMMENT_UPDATE, COMMENT_GET_ALL, COMMENT_GET_THREAD, COMMENT_GET_THREADS, COMMENT_STREAM
+from app.services.blog_service import BlogService
 from app.services.comment_service import CommentService
+from app.utils import parse_fields, sparse_response
+from app.events import broker
+from app.tracing import TracedRoute
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(dependencies= [Depends(get_current_user)])
+router = APIRouter(route_class=TracedRoute, dependencies=[Depends(get_current_user)])
 
 def get_comment_service(require_user: bool = False):
     """
@@ -30,31 +36,57 @@ def get_comment_service(require_user: bool = False):
     return _get_service
 
 @router.post('/{blog_id}', status_code=status.HTTP_201_CREATED, description=COMMENT_CREATE)
-def comment_on_blog(blog_id: int, service: CommentService = Depends(get_comment_service(True))) -> schemas.CreateComment:
-    logger.info(f"comment_on_blog endpoint has been called for blog_id: {blog_id}")
-    return service.comment_on_blog(blog_id)
+def comment_on_blog(blog_id: int, request: schemas.CreateComment, service: CommentService = Depends(get_comment_service(True))) -> schemas.GetComment:
+    logger.info("comment_on_blog endpoint has been called for blog_id: %s", blog_id)
+    return service.comment_on_blog(request, blog_id)
 
 @router.get("/{blog_id}", status_code=status.HTTP_200_OK, description=COMMENT_GET_ALL)
-def get_comments(blog_id: int, include_all: Optional[bool] = False, author_id: Optional[int] = None, service: CommentService = Depends(get_comment_service(False))) -> List[schemas.GetComment]:
-    logger.info(f"get_comments endpoint has been called for blog_id: {blog_id}, include_all: {include_all}, author_id: {author_id}")
-    return service.get_comments(blog_id, include_all, author_id)
+def get_comments(blog_id: int, include_all: Optional[bool] = False, author_id: Optional[int] = None, fields: Optional[str] = None, sort: Optional[str] = Query(None, pattern="^top$"), limit: Optional[int] = Query(None, ge=1, le=100), service: CommentService = Depends(get_comment_service(True))) -> List[schemas.GetComment]:
+    logger.info("get_comments endpoint has been called for blog_id: %s, include_all: %s, author_id: %s, sort: %s", blog_id, include_all, author_id, sort)
+    selected = parse_fields(fields, schemas.GetComment)
+    return sparse_response(service.get_comments(author_id=author_id, blog_id=blog_id, include_all=include_all, fields=selected, sort=sort, limit=limit), selected)
+
+@router.get("/{blog_id}/threads", status_code=status.HTTP_200_OK, description=COMMENT_GET_THREADS)
+def get_comment_threads(blog_id: int, limit: Optional[int] = Query(None, ge=1, le=100), after: Optional[str] = None, max_depth: Optional[int] = Query(None, ge=0), service: CommentService = Depends(get_comment_service(True))) -> schemas.CommentThreadPage:
+    logger.info("get_comment_threads endpoint has been called for blog_id: %s, after: %s, max_depth: %s", blog_id, after, max_depth)
+    return service.get_threads(blog_id, limit, after, max_depth)
+
+@router.get("/{blog_id}/stream", status_code=status.HTTP_200_OK, description=COMMENT_STREAM)
+async def stream_comments(blog_id: int, db: Session = Depends(get_db), current_user: schemas.User = Depends(get_current_user)):
+    logger.info("stream_comments endpoint has been called for blog_id: %s", blog_id)
+    # 404 for unknown blogs and 403 for other users' drafts, same as GET /blog/{id}
+    await run_in_threadpool(BlogService(db, current_user).get_blog_by_id, blog_id, {"id"})
+    # Auth is done; don't hold a pooled connection for the lifetime of the stream
+    await run_in_threadpool(db.close)
+    if broker.subscriber_count >= broker.max_subscribers:
+        raise HTTPException(status_code=503, detail="Too many live subscribers, fall back to polling")
+    return StreamingResponse(
+        broker.stream(blog_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/thread/{comment_id}", status_code=status.HTTP_200_OK, description=COMMENT_GET_THREAD)
+def get_comment_thread(comment_id: int, max_depth: Optional[int] = Query(None, ge=0), branches: Optional[int] = Query(None, ge=1), service: CommentService = Depends(get_comment_service(True))) -> schemas.CommentNode:
+    logger.info("get_comment_thread endpoint has been called for comment_id: %s, max_depth: %s, branches: %s", comment_id, max_depth, branches)
+    return service.get_thread(comment_id, max_depth, branches)
 
 @router.post('/like/{comment_id}', status_code=status.HTTP_202_ACCEPTED, description=COMMENT_LIKE)
 def like_comment(comment_id: int, service: CommentService = Depends(get_comment_service(True))) -> dict:
-    logger.info(f"like_comment endpoint has been called for comment_id: {comment_id}")
+    logger.info("like_comment endpoint has been called for comment_id: %s", comment_id)
     return service.like_comment(comment_id)
 
 @router.post('/unlike/{comment_id}', status_code=status.HTTP_202_ACCEPTED)
 def unlike_comment(comment_id: int, service: CommentService = Depends(get_comment_service(True))) -> dict:
-    logger.info(f"unlike_comment endpoint has been called for comment_id: {comment_id}")
+    logger.info("unlike_comment endpoint has been called for comment_id: %s", comment_id)
     return service.unlike_comment(comment_id)
 
 @router.put('/{comment_id}', status_code=status.HTTP_202_ACCEPTED, description=COMMENT_UPDATE)
 def update_comment(comment_id: int, request: schemas.CommentUpdate, service: CommentService = Depends(get_comment_service(True))) -> schemas.CommentUpdate:
-    logger.info(f"update_comment endpoint has been called for comment_id: {comment_id}")
-    return service.update_comment(comment_id, request)
+    logger.info("update_comment endpoint has been called for comment_id: %s", comment_id)
+    return service.update_comment(request, comment_id)
 
 @router.delete('/{comment_id}', status_code=status.HTTP_202_ACCEPTED, description=COMMENT_DELETE)
 def delete_comment(comment_id: int, service: CommentService = Depends(get_comment_service(True))):
-    logger.info(f"delete_comment endpoint has been called for comment_id: {comment_id}")
+    logger.info("delete_comment endpoint has been called for comment_id: %s", comment_id)
     return service.delete_comment(comment_id)
\ No newline at end of file
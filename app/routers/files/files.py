@@ -1,5 +1,6 @@
 from urllib import response
-from fastapi import HTTPException, Depends, status
+from fastapi import HTTPException, Depends, Query, status
+from fastapi.responses import FileResponse
 from fastapi import APIRouter, UploadFile, File
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
@@ -8,34 +9,44 @@ from app.db.models import Blog, User
 from app.db.database import get_db
 from app.db import schemas
 from app.auth.auth_utils import get_current_user
-from app.utils import upload_profile_picture, upload_cover_photo
-from app.api_descriptions import FILE_GET_COVER_PHOTO, FILE_GET_PROFILE_PIC, FILE_UPLOAD_PROFILE_PIC, FILE_UPLOAD_COVER_PHOTO, FILE_DELETE_PROFILE_PIC, FILE_DELETE_COVER_PHOTO
-import cloudinary.uploader
+from app.services.upload_jobs import upload_queue
+from app.services.media_gc import media_collector
+from app.storage import get_storage
+from app.images import pick_variant
+from app.api_descriptions import FILE_GET_COVER_PHOTO, FILE_GET_PROFILE_PIC, FILE_UPLOAD_PROFILE_PIC, FILE_UPLOAD_COVER_PHOTO, FILE_DELETE_PROFILE_PIC, FILE_DELETE_COVER_PHOTO, FILE_GET_UPLOAD, FILE_GET_MEDIA, FILE_COLLECT_MEDIA
+from app.tracing import TracedRoute
 
-router = APIRouter(dependencies=[Depends(get_current_user)])
+router = APIRouter(route_class=TracedRoute, dependencies=[Depends(get_current_user)])
+# Public: <img> tags can't send the Authorization header
+media_router = APIRouter(route_class=TracedRoute)
 
-@router.post('/upload-profile-pic', description=FILE_UPLOAD_PROFILE_PIC)
-def upload_profile_pic(db: Session = Depends(get_db), user: schemas.User = Depends(get_current_user), file: UploadFile = File(...)):
-    try:
-        user_model: User = db.query(User).filter(User.id == user.id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        response = upload_profile_picture(user_model, file, db)
-        if "error" in response:
-            raise HTTPException(status_code=400, detail=response["error"])
+@media_router.get('/{name}', description=FILE_GET_MEDIA)
+def get_media(name: str):
+    path = get_storage().local_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    # Names are content hashes, so a name's bytes never change
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
-        return response
-    
-    except Exception as e:
-        print(f"error: {e}")
-        raise HTTPException(
-            status_code=500, detail="Error uploading image")
+@router.post('/upload-profile-pic', status_code=status.HTTP_202_ACCEPTED, description=FILE_UPLOAD_PROFILE_PIC)
+def upload_profile_pic(user: schemas.User = Depends(get_current_user), file: UploadFile = File(...)) -> schemas.UploadJob:
+    return upload_queue.submit(user.id, "profile_pic", file)
+
+@router.post('/gc', description=FILE_COLLECT_MEDIA)
+def collect_media(dry_run: bool = True, db: Session = Depends(get_db), user: schemas.User = Depends(get_current_user)) -> schemas.MediaGCReport:
+    if user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Only admins can collect orphaned media")
+    return media_collector.run(db, dry_run)
+
+@router.get('/uploads/{job_id}', description=FILE_GET_UPLOAD)
+def get_upload(job_id: str, user: schemas.User = Depends(get_current_user)) -> schemas.UploadJob:
+    return upload_queue.get(job_id, user.id)
     
 @router.get('/profile-pic', description=FILE_GET_PROFILE_PIC)
-def get_profile_pic(user: schemas.User = Depends(get_current_user)):
+def get_profile_pic(size: Optional[int] = Query(None, ge=1), user: schemas.User = Depends(get_current_user)):
     try:
         if user.profile_url:
-            return {"profile_url": user.profile_url}
+            return {"profile_url": pick_variant(user.profile_url, user.profile_variants, "profile_pic", size)}
         else:
             raise HTTPException(status_code=404, detail="User does not have a profile picture")
     except SQLAlchemyError as e:
@@ -44,10 +55,10 @@ def get_profile_pic(user: schemas.User = Depends(get_current_user)):
             status_code=500, detail="Error retrieving profile picture")
     
 @router.get('/cover-photo', description=FILE_GET_COVER_PHOTO)
-def get_cover_photo(user: schemas.User = Depends(get_current_user)):
+def get_cover_photo(size: Optional[int] = Query(None, ge=1), user: schemas.User = Depends(get_current_user)):
     try:
         if user.cover_photo_url:
-            return {"cover_photo_url": user.cover_photo_url}
+            return {"cover_photo_url": pick_variant(user.cover_photo_url, user.cover_photo_variants, "cover_photo", size)}
         else:
             raise HTTPException(status_code=404, detail="User does not have a cover photo")
     except SQLAlchemyError as e:
@@ -55,34 +66,22 @@ def get_cover_photo(user: schemas.User = Depends(get_current_user)):
         raise HTTPException(
             status_code=500, detail="Error retrieving cover photo")
     
-@router.post('/upload-cover-photo', description=FILE_UPLOAD_COVER_PHOTO )
-def upload_cover_photo(db: Session = Depends(get_db), user: schemas.User = Depends(get_current_user), file: UploadFile = File(...)):
-    try:
-        user_model: User = db.query(User).filter(User.id == user.id).first()
-        response = upload_cover_photo(user_model, file, db)
-        if "error" in response:
-            raise HTTPException(status_code=400, detail=response["error"])
-
-        return response
-    
-    except Exception as e:
-        print(f"error: {e}")
-        raise HTTPException(
-            status_code=500, detail="Error uploading cover photo")
+@router.post('/upload-cover-photo', status_code=status.HTTP_202_ACCEPTED, description=FILE_UPLOAD_COVER_PHOTO )
+def upload_cover_photo(user: schemas.User = Depends(get_current_user), file: UploadFile = File(...)) -> schemas.UploadJob:
+    return upload_queue.submit(user.id, "cover_photo", file)
     
 @router.delete('/delete-profile-pic', description=FILE_DELETE_PROFILE_PIC)
 def delete_profile_pic(db: Session = Depends(get_db), user: schemas.User = Depends(get_current_user)):
     try:
         # Check if user has a profile picture
         if user.profile_url:
-            public_id = user.profile_url.split("/")[-1].split(".")[0]
-            cloudinary.uploader.destroy(public_id)
             user_model = db.query(User).filter(User.id == user.id).first()
             if not user:
                 raise HTTPException(status_code=404, detail="User not found")
             user_model.profile_url = None
+            user_model.profile_variants = None
             db.commit()
-            db.refresh(user_model)
+            upload_queue.delete_later(user.profile_url, user.profile_variants)
             return {"detail": "Profile picture deleted"}
         else:
             raise HTTPException(status_code=400, detail="User does not have a profile picture")
@@ -98,12 +97,10 @@ def delete_cover_photo(db: Session = Depends(get_db), user: schemas.User = Depen
         if not user_model:
             raise HTTPException(status_code=404, detail="User not found")
         if user.cover_photo_url:
-            public_id = user.cover_photo_url.split("/")[-1].split(".")[0]
-            cloudinary.uploader.destroy(public_id)
-
             user_model.cover_photo_url = None
+            user_model.cover_photo_variants = None
             db.commit()
-            db.refresh(user_model)
+            upload_queue.delete_later(user.cover_photo_url, user.cover_photo_variants)
             return {"detail": "Profile picture deleted"}
         else:
             raise HTTPException(status_code=400, detail="User does not have a profile picture")
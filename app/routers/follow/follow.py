@@ -1,15 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.db.database import get_db
 from app.db import schemas
 from app.auth.auth_utils import get_current_user
 from app.services.follow_service import FollowService
+from app.utils import parse_fields, parse_id_list, sparse_response
+from app.config import settings
+from app.tracing import TracedRoute
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(dependencies= [Depends(get_current_user)])
+router = APIRouter(route_class=TracedRoute, dependencies=[Depends(get_current_user)])
 
 def get_follow_service(require_user: bool = False):
     """Factory to enforce (or skip) auth dynamically per route."""
@@ -22,26 +25,61 @@ def get_follow_service(require_user: bool = False):
         return FollowService(db, current_user)
     return _get_service
 
+def check_bulk_ids(user_ids: List[int]) -> List[int]:
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="At least one id is required")
+    if len(user_ids) > settings.FOLLOW_BULK_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many ids requested (max {settings.FOLLOW_BULK_MAX_IDS})")
+    return user_ids
+
+# Declared before /{userId} so "bulk" isn't parsed as a user id
+@router.post('/bulk', status_code=status.HTTP_200_OK)
+def follow_users(request: schemas.BulkFollow, service: FollowService = Depends(get_follow_service(True))) -> schemas.BulkFollowResult:
+    logger.info("follow_users endpoint has been called with %s ids", len(request.user_ids))
+    return service.follow_users(check_bulk_ids(request.user_ids))
+
+@router.delete('/bulk', status_code=status.HTTP_200_OK)
+def unfollow_users(ids: str = Query(...), service: FollowService = Depends(get_follow_service(True))) -> schemas.BulkUnfollowResult:
+    logger.info("unfollow_users endpoint has been called")
+    return service.unfollow_users(parse_id_list(ids, settings.FOLLOW_BULK_MAX_IDS))
+
 @router.post('/{userId}', status_code=status.HTTP_201_CREATED)
 def follow_user(userId: int, service: FollowService = Depends(get_follow_service(True))):
-    logger.info(f"follow_user endpoint has been called")
+    logger.info("follow_user endpoint has been called")
     return service.follow_user(userId)
 
 @router.delete('/{userId}', status_code=status.HTTP_202_ACCEPTED)
 def unfollow(userId: int, service: FollowService = Depends(get_follow_service(True))):
-    logger.info(f"unfollow_user endpoint has been called with userId: {userId}")
+    logger.info("unfollow_user endpoint has been called with userId: %s", userId)
     return service.unfollow_user(userId)
 
 
 @router.get('/following', status_code=status.HTTP_200_OK)
-def get_following(alt_user: Optional[int] = None, service: FollowService = Depends(get_follow_service(True))) -> List[schemas.UserSummary]:
-    logger.info(f"get_following endpoint has been called")
-    return service.get_following(alt_user)
+def get_following(alt_user: Optional[int] = None, fields: Optional[str] = None, service: FollowService = Depends(get_follow_service(True))) -> List[schemas.UserSummary]:
+    logger.info("get_following endpoint has been called")
+    selected = parse_fields(fields, schemas.UserSummary)
+    return sparse_response(service.get_following(alt_user, selected), selected)
 
 @router.get('/followers', status_code=status.HTTP_200_OK)
-def get_followers(alt_user: Optional[int] = None, service: FollowService = Depends(get_follow_service(True))) -> List[schemas.UserSummary]:
-    logger.info(f"get_followers endpoint has been called with alt_user: {alt_user}")
-    return service.get_followers(alt_user)
+def get_followers(alt_user: Optional[int] = None, fields: Optional[str] = None, service: FollowService = Depends(get_follow_service(True))) -> List[schemas.UserSummary]:
+    logger.info("get_followers endpoint has been called with alt_user: %s", alt_user)
+    selected = parse_fields(fields, schemas.UserSummary)
+    return sparse_response(service.get_followers(alt_user, selected), selected)
+
+@router.get('/status', status_code=status.HTTP_200_OK)
+def get_follow_status(ids: str = Query(...), service: FollowService = Depends(get_follow_service(True))) -> List[schemas.FollowStatus]:
+    logger.info("get_follow_status endpoint has been called with ids: %s", ids)
+    return service.get_follow_status(parse_id_list(ids))
+
+@router.get('/suggestions', status_code=status.HTTP_200_OK)
+def get_suggestions(limit: int = Query(settings.FOLLOW_SUGGESTIONS_LIMIT, ge=1, le=100), service: FollowService = Depends(get_follow_service(True))) -> List[schemas.FollowSuggestion]:
+    logger.info("get_suggestions endpoint has been called")
+    return service.get_suggestions(limit)
+
+@router.get('/mutual/{user_id}', status_code=status.HTTP_200_OK)
+def get_mutual_followers(user_id: int, service: FollowService = Depends(get_follow_service(True))) -> List[schemas.UserSummary]:
+    logger.info("get_mutual_followers endpoint has been called with user_id: %s", user_id)
+    return service.get_mutual_followers(user_id)
 
 
 # *, ALLOWS YOU TO LIST PARAMS IN ANY ORDER.... So query before default params: From tomi fast api (36:52)e.t.c
\ No newline at end of file
@@ -1,12 +1,15 @@
-from fastapi import Depends, status, HTTPException
+from fastapi import Depends, status, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from app.db.database import get_db
 from app.db import schemas
 from app.auth.auth_utils import get_current_user
-from app.api_descriptions import USER_GET_ALL, USER_UPDATE, USER_DELETE, USER_GET_CURRENT_USER
+from app.utils import parse_id_list, parse_fields, sparse_response
+from app.api_descriptions import USER_GET_ALL, USER_UPDATE, USER_DELETE, USER_GET_CURRENT_USER, USER_GET_BATCH, USER_GET_STATS, USER_SEARCH, USER_GET_PURGES
 from fastapi import APIRouter
 from app.services.user_service import UserService
+from app.config import settings
+from app.tracing import TracedRoute
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,17 +25,39 @@ def get_user_service(require_user: bool = False):
         return UserService(db, current_user)
     return _get_service
 
-router = APIRouter(dependencies=[Depends(get_current_user)])
+router = APIRouter(route_class=TracedRoute, dependencies=[Depends(get_current_user)])
 
 @router.get('/all', status_code=status.HTTP_200_OK, description=USER_GET_ALL) 
-def get_users(service: UserService = Depends(get_user_service(False))) -> List[schemas.UserSummary]:
+def get_users(fields: Optional[str] = None, service: UserService = Depends(get_user_service(False))) -> List[schemas.UserSummary]:
     logger.info("get_users endpoint has been called")
-    return service.get_users()
+    selected = parse_fields(fields, schemas.UserSummary)
+    return sparse_response(service.get_users(selected), selected)
+
+@router.get('/batch', status_code=status.HTTP_200_OK, description=USER_GET_BATCH)
+def get_users_by_ids(ids: str = Query(...), service: UserService = Depends(get_user_service(True))) -> List[schemas.UserBatchItem]:
+    logger.info("get_users_by_ids endpoint has been called with ids: %s", ids)
+    return service.get_users_by_ids(parse_id_list(ids))
+
+@router.get('/search', status_code=status.HTTP_200_OK, description=USER_SEARCH)
+def search_users(prefix: str = Query(..., min_length=1, max_length=255), limit: int = Query(settings.USER_SEARCH_LIMIT, ge=1, le=settings.USER_SEARCH_MAX_LIMIT), service: UserService = Depends(get_user_service(True))) -> List[schemas.UserSearchResult]:
+    logger.info("search_users endpoint has been called")
+    return service.search_users(prefix, limit)
+
+@router.get('/purges', status_code=status.HTTP_200_OK, description=USER_GET_PURGES)
+def get_purge_status(service: UserService = Depends(get_user_service(True))) -> List[schemas.AccountPurgeStatus]:
+    logger.info("get_purge_status endpoint has been called")
+    return service.get_purge_status()
+
+@router.get('/{user_id}/stats', status_code=status.HTTP_200_OK, description=USER_GET_STATS)
+def get_user_stats(user_id: int, service: UserService = Depends(get_user_service(True))) -> schemas.UserStats:
+    logger.info("get_user_stats endpoint has been called with user_id: %s", user_id)
+    return service.get_user_stats(user_id)
 
 @router.get('/current', status_code=status.HTTP_200_OK, description=USER_GET_CURRENT_USER)
-def get_current_user(altId : Optional[int] = None, service: UserService = Depends(get_user_service(True))) -> schemas.User:
+def get_current_user(altId : Optional[int] = None, fields: Optional[str] = None, service: UserService = Depends(get_user_service(True))) -> schemas.User:
     logger.info("get_user_by_id endpoint has been called")
-    return service.get_current_user(altId)
+    selected = parse_fields(fields, schemas.User)
+    return sparse_response(service.get_current_user(altId, selected), selected)
 
 @router.put('/update', status_code=status.HTTP_200_OK, description=USER_UPDATE)
 def update_user(request: schemas.UserUpdate, service: UserService = Depends(get_user_service(True))):
@@ -0,0 +1,163 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models import User, Blog, BlogLike, Comment, CommentLike, Follow
+from app.services.comment_service import subtree_upper_bound
+
+logger = logging.getLogger(__name__)
+
+
+class AccountPurger:
+    """
+    Background job removing soft-deleted accounts and everything they own.
+
+    All work is bulk DELETEs of at most `batch_size` rows, each committed on its own, so
+    locks stay short. `users.deleted_at` is the only state: after a crash the job picks up
+    every soft-deleted user again and the remaining batches carry on where they stopped.
+    Batches are claimed with SELECT ... FOR UPDATE SKIP LOCKED so workers sharing the
+    database don't process the same rows twice.
+    """
+
+    def __init__(self, batch_size: int = settings.PURGE_BATCH_SIZE, poll_seconds: float = settings.PURGE_POLL_SECONDS,
+                 progress_retention_seconds: float = settings.PURGE_PROGRESS_RETENTION_SECONDS):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.progress_retention = timedelta(seconds=progress_retention_seconds)
+        self.progress: Dict[int, dict] = {}  # user id -> status of the purge run by this worker
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def wake(self):
+        self._wake.set()
+
+    def _delete_batches(self, db: Session, progress: dict, table: str, model, criteria: list, order_by=None, before: Optional[Callable] = None) -> int:
+        """Delete the matching rows this worker can claim; returns how many it deleted."""
+        deleted = 0
+        while True:
+            query = db.query(model.id).filter(*criteria)
+            if order_by is not None:
+                query = query.order_by(order_by)
+            ids = [row[0] for row in query.limit(self.batch_size).with_for_update(skip_locked=True).all()]
+            if not ids:
+                db.commit()  # release the (empty) claim
+                return deleted
+            if before is not None:
+                before(db, ids)
+            db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(ids)
+            progress["deleted"][table] = progress["deleted"].get(table, 0) + len(ids)
+
+    @staticmethod
+    def _release_comment_likes(db: Session, like_ids: List[int]):
+        # Keep the denormalized counters in step with the likes being removed
+        db.query(Comment).filter(
+            Comment.id.in_(select(CommentLike.comment_id).where(CommentLike.id.in_(like_ids)))
+        ).update({Comment.like_count: Comment.like_count - 1}, synchronize_session=False)
+
+    def _purge_comment_subtrees(self, db: Session, progress: dict, user_id: int) -> bool:
+        """
+        Delete the user's comments on other people's blogs with their reply subtrees,
+        as deleting a single comment does.
+
+        Returns:
+            bool: False if a pass deleted nothing because another worker holds the rows;
+                the purge is then left for the next run instead of spinning.
+        """
+        while True:
+            roots = (
+                db.query(Comment.id, Comment.blog_id, Comment.path)
+                .filter(Comment.author_id == user_id)
+                .order_by(Comment.depth)
+                .limit(min(self.batch_size, 100))
+                .all()
+            )
+            if not roots:
+                return True
+            in_subtrees = or_(*[
+                and_(Comment.blog_id == root.blog_id, Comment.path >= root.path, Comment.path < subtree_upper_bound(root.path))
+                if root.path else Comment.id == root.id
+                for root in roots
+            ])
+            self._delete_batches(db, progress, "comment_likes", CommentLike, [CommentLike.comment_id.in_(select(Comment.id).where(in_subtrees))])
+            if not self._delete_batches(db, progress, "comments", Comment, [in_subtrees], order_by=Comment.depth.desc()):
+                return False
+
+    def purge_user(self, db: Session, user_id: int):
+        """
+        Delete one soft-deleted user's rows, children first, then the user.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            user_id (int): The ID of the soft-deleted user.
+        """
+        progress = self.progress.setdefault(user_id, {"user_id": user_id, "deleted": {}})
+        progress.update(status="running", started_at=datetime.now(timezone.utc), finished_at=None, error=None)
+        logger.info("Purging account %s", user_id)
+
+        own_blogs = select(Blog.id).where(Blog.author_id == user_id)
+        try:
+            self._delete_batches(db, progress, "comment_likes", CommentLike, [CommentLike.user_id == user_id], before=self._release_comment_likes)
+            self._delete_batches(db, progress, "blog_likes", BlogLike, [BlogLike.user_id == user_id])
+            self._delete_batches(db, progress, "follows", Follow, [or_(Follow.follower_id == user_id, Follow.followed_id == user_id)])
+            # Everything under the user's blogs, leaves first so no delete cascades further
+            self._delete_batches(db, progress, "comment_likes", CommentLike, [CommentLike.comment_id.in_(select(Comment.id).where(Comment.blog_id.in_(own_blogs)))])
+            self._delete_batches(db, progress, "comments", Comment, [Comment.blog_id.in_(own_blogs)], order_by=Comment.depth.desc())
+            self._delete_batches(db, progress, "blog_likes", BlogLike, [BlogLike.blog_id.in_(own_blogs)])
+            self._delete_batches(db, progress, "blogs", Blog, [Blog.author_id == user_id])
+            if not self._purge_comment_subtrees(db, progress, user_id):
+                progress.update(status="pending")
+                logger.info("Comments of account %s are being purged by another worker, retrying on the next run", user_id)
+                return
+
+            db.query(User).filter(User.id == user_id, User.deleted_at.isnot(None)).delete(synchronize_session=False)
+            db.commit()
+            progress.update(status="done", finished_at=datetime.now(timezone.utc))
+            logger.info("Purged account %s: %s", user_id, progress['deleted'])
+        except Exception as e:
+            db.rollback()
+            progress.update(status="failed", error=str(e))
+            logger.error("Error purging account %s, will resume on the next run: %s", user_id, e)
+
+    def _prune_progress(self):
+        # Keep finished purges listed for a while, not for the life of the process
+        cutoff = datetime.now(timezone.utc) - self.progress_retention
+        for user_id, progress in list(self.progress.items()):
+            if progress.get("finished_at") is not None and progress["finished_at"] < cutoff:
+                self.progress.pop(user_id, None)
+
+    def purge_pending(self, db: Session):
+        """Purge every soft-deleted user, oldest deletion first."""
+        self._prune_progress()
+        user_ids = [row[0] for row in db.query(User.id).filter(User.deleted_at.isnot(None)).order_by(User.deleted_at).all()]
+        for user_id in user_ids:
+            self.purge_user(db, user_id)
+
+    def start(self, session_factory: Callable[[], Session]):
+        """Run in a daemon thread: purge pending accounts, then sleep until woken or `poll_seconds` pass."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                db = session_factory()
+                try:
+                    self.purge_pending(db)
+                except Exception as e:
+                    logger.error("Error running account purge: %s", e)
+                finally:
+                    db.close()
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+        self._thread = threading.Thread(target=run, name="account-purge", daemon=True)
+        self._thread.start()
+
+
+account_purger = AccountPurger()
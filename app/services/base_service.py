@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.db import schemas
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Set, Type
+from pydantic import BaseModel
 
 
 class BaseService:
@@ -13,4 +14,76 @@ class BaseService:
             current_user (User): The currently authenticated user.
         """
         self.db = db
-        self.current_user = current_user
\ No newline at end of file
+        self.current_user = current_user
+
+    def select_fields(self, model, schema: Type[BaseModel], fields: Optional[Set[str]] = None, computed: Optional[Dict[str, Callable]] = None) -> list:
+        """
+        Build the column list for a (possibly sparse) read query.
+
+        Args:
+            model: The SQLAlchemy model the columns come from.
+            schema (Type[BaseModel]): The response schema describing every available field.
+            fields (Optional[Set[str]]): The requested fields, or None for the whole schema.
+            computed (Optional[Dict[str, Callable]]): Builders for derived fields such as counts.
+                Only the requested ones are called, so unrequested subqueries never reach the SQL.
+
+        Returns:
+            list: Column expressions to pass to `db.query`. The primary key is always selected.
+        """
+        wanted = fields or set(schema.model_fields)
+        computed = computed or {}
+        columns = [model.id]
+        for name in schema.model_fields:
+            if name == 'id' or name not in wanted:
+                continue
+            if name in computed:
+                columns.append(computed[name]().label(name))
+            elif name in model.__table__.columns:
+                columns.append(getattr(model, name))
+        return columns
+
+    def liked_ids(self, target_column, rows, fields: Optional[Set[str]] = None) -> Optional[Set[int]]:
+        """
+        Resolve which of a page of rows the current user has liked, in one query.
+
+        Args:
+            target_column: The like table's foreign key to the liked item (e.g. `BlogLike.blog_id`).
+            rows: The page of rows; each must expose `id`.
+            fields (Optional[Set[str]]): The requested fields. The lookup is skipped if `liked_by_me` isn't among them.
+
+        Returns:
+            Optional[Set[int]]: The liked IDs, or None when there is no current user or the flag wasn't requested.
+        """
+        if self.current_user is None or (fields is not None and "liked_by_me" not in fields):
+            return None
+        ids = [row.id for row in rows]
+        if not ids:
+            return set()
+        like_model = target_column.class_
+        liked = (
+            self.db.query(target_column)
+            .filter(like_model.user_id == self.current_user.id, target_column.in_(ids))
+            .all()
+        )
+        return {row[0] for row in liked}
+
+    def render_rows(self, rows, schema: Type[BaseModel], fields: Optional[Set[str]] = None, liked: Optional[Set[int]] = None) -> List:
+        """
+        Serialize rows produced by a `select_fields` query.
+
+        Args:
+            rows: The result rows.
+            schema (Type[BaseModel]): The full response schema.
+            fields (Optional[Set[str]]): The requested fields, or None for the whole schema.
+            liked (Optional[Set[int]]): Result of `liked_ids`; when given, each item gets a `liked_by_me` flag.
+
+        Returns:
+            List: Schema instances, or plain dicts narrowed to `fields` when a sparse fieldset was requested.
+        """
+        items = []
+        for row in rows:
+            item = dict(row._mapping) if fields is None else {name: value for name, value in row._mapping.items() if name in fields}
+            if liked is not None:
+                item["liked_by_me"] = row.id in liked
+            items.append(schema(**item) if fields is None else item)
+        return items
@@ -1,17 +1,31 @@
 import logging
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
-from app.db.models import User, Blog, BlogLike
+from app.db.models import User, Blog, BlogLike, Comment
 from app.db import schemas
-from typing import List, Optional
+from typing import List, Optional, Set
 
 from app.services.base_service import BaseService
+from app.events import broker
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Count fields are correlated subqueries, built only when the caller asks for them
+BLOG_COUNTS = {
+    "like_count": lambda: select(func.count(BlogLike.id)).where(BlogLike.blog_id == Blog.id).scalar_subquery(),
+    "comment_count": lambda: select(func.count(Comment.id)).where(Comment.blog_id == Blog.id).scalar_subquery(),
+}
+
 class BlogService(BaseService):
 
+    def _can_view(self, blog: Blog) -> bool:
+        # Drafts are only visible to their author and to admins
+        if blog.published:
+            return True
+        return self.current_user is not None and (blog.author_id == self.current_user.id or self.current_user.role == 'admin')
+
     def create_blog(self, request: schemas.BlogCreate) -> schemas.Blog:
         """
         Create a new blog post.
@@ -30,7 +44,7 @@ class BlogService(BaseService):
                 author_id = request.author_id or self.current_user.id
                 author = self.db.query(User).filter(User.id == request.author_id).first()
                 if not author:
-                    logger.warning(f"Author with id({request.author_id}) not found")
+                    logger.warning("Author with id(%s) not found", request.author_id)
                     raise HTTPException(
                         status_code=404,
                         detail=f"Author with id({request.author_id}) not found"
@@ -50,34 +64,35 @@ class BlogService(BaseService):
             self.db.add(new_blog)
             self.db.commit()
             self.db.refresh(new_blog)
-            logger.info(f"Blog created with id({new_blog.id}) by user({author_id})")
+            logger.info("Blog created with id(%s) by user(%s)", new_blog.id, author_id)
             return new_blog
 
         except SQLAlchemyError as e:
-            logger.error(f"Error creating blog: {str(e)}")
+            logger.error("Error creating blog: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error creating blog")
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error creating blog: {str(e)}")
+            logger.error("Error creating blog: %s", e)
             raise HTTPException(status_code=500, detail="Error creating blog")
 
-    def get_all_blogs(self, user_id: Optional[int] = None) -> List[schemas.Blog]:
+    def get_all_blogs(self, user_id: Optional[int] = None, fields: Optional[Set[str]] = None) -> List[schemas.Blog]:
         """
         Retrieve all blogs, optionally filtered by user ID.
 
         Args:
             user_id (Optional[int]): The ID of the user whose blogs to retrieve.
+            fields (Optional[Set[str]]): Sparse fieldset to select and return. Defaults to every field.
 
         Returns:
-            List[schemas.Blog]: A list of blogs.
+            List[schemas.Blog]: A list of blogs (dicts narrowed to `fields` when given).
 
         Raises:
             HTTPException: If no blogs are found or an error occurs.
         """
         try:
-            query = self.db.query(Blog)
+            query = self.db.query(*self.select_fields(Blog, schemas.Blog, fields, BLOG_COUNTS))
 
             if self.current_user is None:
                 # Unauthenticated users see only published blogs
@@ -100,29 +115,25 @@ class BlogService(BaseService):
                 logger.warning("No blogs found")
                 raise HTTPException(status_code=404, detail="Blogs not found")
             
-            return [
-                schemas.Blog(
-                    **{k: v for k, v in blog.__dict__.items() if not k.startswith('_')},
-                    like_count=len(blog.likes) if hasattr(blog,'likes') and blog.likes else 0,
-                    comment_count=len(blog.comments) if hasattr(blog, 'comments') and blog.comments else 0,
-                )
-                for blog in blogs
-            ]
+            return self.render_rows(blogs, schemas.Blog, fields, self.liked_ids(BlogLike.blog_id, blogs, fields))
 
         except HTTPException:
             raise
         except SQLAlchemyError as e:
-            logger.error(f"Error getting blogs: {str(e)}")
+            logger.error("Error getting blogs: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error retrieving blogs")
         except Exception as e:
-            logger.error(f"Error getting blogs: {str(e)}")
+            logger.error("Error getting blogs: %s", e)
             raise HTTPException(status_code=500, detail="Error retrieving blogs")
 
-    def get_current_user_blogs(self) -> List[schemas.Blog]:
+    def get_current_user_blogs(self, fields: Optional[Set[str]] = None) -> List[schemas.Blog]:
         """
         Retrieve all blogs authored by the current user.
 
+        Args:
+            fields (Optional[Set[str]]): Sparse fieldset to select and return. Defaults to every field.
+
         Returns:
             List[schemas.Blog]: A list of blogs authored by the current user.
 
@@ -130,33 +141,33 @@ class BlogService(BaseService):
             HTTPException: If no blogs are found or an error occurs.
         """
         try:
-            blogs = self.db.query(Blog).filter(Blog.author_id == self.current_user.id).all()
+            blogs = (
+                self.db.query(*self.select_fields(Blog, schemas.Blog, fields, BLOG_COUNTS))
+                .filter(Blog.author_id == self.current_user.id)
+                .all()
+            )
             if not blogs:
-                logger.warning(f"No blogs found for user {self.current_user.id}")
+                logger.warning("No blogs found for user %s", self.current_user.id)
                 raise HTTPException(status_code=404, detail="No blogs found for this user")
 
-            return [
-                schemas.Blog(
-                    **{k: v for k, v in blog.__dict__.items() if not k.startswith('_')},
-                    like_count=len(blog.likes) if hasattr(blog, 'likes') and blog.likes else 0,
-                    comment_count=len(blog.comments) if hasattr(blog, 'comments') and blog.comments else 0,
-                )
-                for blog in blogs
-            ]
+            return self.render_rows(blogs, schemas.Blog, fields, self.liked_ids(BlogLike.blog_id, blogs, fields))
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
-            logger.error(f"Error getting blog: {str(e)}")
+            logger.error("Error getting blog: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error getting blog")
         except Exception as e:
-            logger.error(f"Error getting blog: {str(e)}")
+            logger.error("Error getting blog: %s", e)
             raise HTTPException(status_code=500, detail="Error getting blog")
 
-    def get_blog_by_id(self, id: int) -> schemas.Blog:
+    def get_blog_by_id(self, id: int, fields: Optional[Set[str]] = None) -> schemas.Blog:
         """
         Retrieve a blog by its ID.
 
         Args:
             id (int): The ID of the blog to retrieve.
+            fields (Optional[Set[str]]): Sparse fieldset to select and return. Defaults to every field.
 
         Returns:
             schemas.Blog: The blog data.
@@ -165,30 +176,80 @@ class BlogService(BaseService):
             HTTPException: If the blog does not exist or the user is not authorized to view it.
         """
         try:
-            blog = self.db.query(Blog).filter(Blog.id == id).first()
+            # The visibility check needs published/author_id even when they weren't requested
+            selected = fields | {"published", "author_id"} if fields else None
+            blog = (
+                self.db.query(*self.select_fields(Blog, schemas.Blog, selected, BLOG_COUNTS))
+                .filter(Blog.id == id)
+                .first()
+            )
             if not blog:
-                logger.warning(f"Blog with id({id}) not found")
+                logger.warning("Blog with id(%s) not found", id)
                 raise HTTPException(status_code=404, detail="Blog not found")
-            if blog.published == False and blog.author_id != self.current_user.id and self.current_user.role != 'admin':
-                logger.warning(f"Unauthorized access to unpublished blog {id} by user {self.current_user.id}")
+            if not self._can_view(blog):
+                logger.warning("Unauthorized access to unpublished blog %s by user %s", id, self.current_user.id)
                 raise HTTPException(status_code=403, detail="You do not have access to this blog")
-            logger.info(f"Blog with id({id}) retrieved by user {self.current_user.id}")
-            return schemas.Blog(
-                **blog.__dict__,
-                like_count=len(blog.likes) if blog.likes else 0,
-                comment_count=len(blog.comments) if blog.comments else 0
-            )
+            logger.info("Blog with id(%s) retrieved by user %s", id, self.current_user.id)
+            return self.render_rows([blog], schemas.Blog, fields)[0]
         
         except SQLAlchemyError as e:
-            logger.error(f"Error getting blog: {str(e)}")
+            logger.error("Error getting blog: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error getting blog")
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error getting blog: {str(e)}")
+            logger.error("Error getting blog: %s", e)
             raise HTTPException(status_code=500, detail="Error getting blog")
 
+    def get_blogs_by_ids(self, ids: List[int]) -> List[schemas.BlogBatchItem]:
+        """
+        Retrieve several blogs by ID in a single query.
+
+        Like and comment counts are computed in the same statement, and the
+        visibility rules of `get_blog_by_id` are applied to every blog.
+
+        Args:
+            ids (List[int]): The blog IDs to retrieve, in the order the caller wants them back.
+
+        Returns:
+            List[schemas.BlogBatchItem]: One entry per requested ID, carrying either the blog or a per-id error.
+
+        Raises:
+            HTTPException: If an error occurs while retrieving the blogs.
+        """
+        try:
+            rows = (
+                self.db.query(*self.select_fields(Blog, schemas.Blog, None, BLOG_COUNTS))
+                .filter(Blog.id.in_(ids))
+                .all()
+            )
+            found = {blog.id: blog for blog in rows}
+            liked = self.liked_ids(BlogLike.blog_id, rows)
+
+            results = []
+            for blog_id in ids:
+                if blog_id not in found:
+                    results.append(schemas.BlogBatchItem(id=blog_id, status_code=404, detail="Blog not found"))
+                    continue
+                blog = found[blog_id]
+                if not self._can_view(blog):
+                    results.append(schemas.BlogBatchItem(id=blog_id, status_code=403, detail="You do not have access to this blog"))
+                    continue
+                results.append(schemas.BlogBatchItem(id=blog_id, status_code=200, blog=self.render_rows([blog], schemas.Blog, liked=liked)[0]))
+            logger.info("Batch of %s blog id(s) resolved, %s found", len(ids), len(found))
+            return results
+
+        except SQLAlchemyError as e:
+            logger.error("Error getting blogs by ids: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error retrieving blogs")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Error getting blogs by ids: %s", e)
+            raise HTTPException(status_code=500, detail="Error retrieving blogs")
+
     def update_blog(self, request: schemas.BlogUpdate, id: int):
         """
         Update a blog post by its ID.
@@ -207,10 +268,10 @@ class BlogService(BaseService):
             blog = self.db.query(Blog).filter(Blog.id == id).first()
 
             if not blog:
-                logger.warning(f"Blog with id({id}) not found for update")
+                logger.warning("Blog with id(%s) not found for update", id)
                 raise HTTPException(status_code=404, detail=f"Blog with id({id}) not found")
             if blog.author_id != self.current_user.id:
-                logger.warning(f"User {self.current_user.id} not authorized to update blog {id}")
+                logger.warning("User %s not authorized to update blog %s", self.current_user.id, id)
                 raise HTTPException(status_code=403, detail="You are not authorized to update this blog")
 
             update_data = request.model_dump(exclude_unset=True)
@@ -219,19 +280,19 @@ class BlogService(BaseService):
 
             self.db.commit()
             self.db.refresh(blog)
-            logger.info(f"Blog with id({id}) updated by user {self.current_user.id}")
+            logger.info("Blog with id(%s) updated by user %s", id, self.current_user.id)
             return {"detail": f"Blog with id({id}) has been updated"}
 
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Error updating blog: {str(e)}")
+            logger.error("Error updating blog: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error updating blog")
         except HTTPException:
             raise
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Error updating blog: {str(e)}")
+            logger.error("Error updating blog: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error updating blog")
 
@@ -251,20 +312,20 @@ class BlogService(BaseService):
         try:
             blog = self.db.query(Blog).filter(Blog.id == id).first()
             if not blog:
-                logger.warning(f"Blog with id({id}) not found for delete")
+                logger.warning("Blog with id(%s) not found for delete", id)
                 raise HTTPException(status_code=404, detail="Blog not found")
             if self.current_user.role == 'author' and blog.author_id != self.current_user.id:
-                logger.warning(f"User {self.current_user.id} not authorized to delete blog {id}")
+                logger.warning("User %s not authorized to delete blog %s", self.current_user.id, id)
                 raise HTTPException(status_code=403, detail="You are not authorized to delete this blog")
 
             self.db.delete(blog)
             self.db.commit()
-            logger.info(f"Blog with id({id}) deleted by user {self.current_user.id}")
+            logger.info("Blog with id(%s) deleted by user %s", id, self.current_user.id)
             return {"detail": f"Blog with id({id}) deleted"}
 
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Error deleting blog: {str(e)}")
+            logger.error("Error deleting blog: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error deleting blog")
         except HTTPException:
@@ -272,16 +333,17 @@ class BlogService(BaseService):
             raise
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Error deleting blog: {str(e)}")
+            logger.error("Error deleting blog: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error deleting blog")
         
-    def sort_by_tag(self, tag:str) -> List[schemas.BlogSummary]:
+    def sort_by_tag(self, tag:str, fields: Optional[Set[str]] = None) -> List[schemas.BlogSummary]:
         """
         Retrieve blogs filtered by a specific tag.
 
         Args:
             tag (str): The tag to filter blogs by.
+            fields (Optional[Set[str]]): Sparse fieldset to select and return. Defaults to every field.
 
         Returns:
             List[schemas.BlogSummary]: A list of blogs with the specified tag.
@@ -290,26 +352,26 @@ class BlogService(BaseService):
             HTTPException: If no blogs are found or an error occurs.
         """
         try:
-            query = self.db.query(Blog).filter(Blog.tag == tag)
+            query = self.db.query(*self.select_fields(Blog, schemas.BlogSummary, fields)).filter(Blog.tag == tag)
 
-            if self.current_user.role != 'admin':  # Normal users should see only published blogs
+            if self.current_user is None or self.current_user.role != 'admin':  # Normal users should see only published blogs
                 query = query.filter(Blog.published == True)
 
             blogs = query.all()
 
             if not blogs:
-                logger.warning(f"No blogs found with tag: {tag}")
+                logger.warning("No blogs found with tag: %s", tag)
                 raise HTTPException(status_code=404, detail="No blogs found with this tag")
 
-            return blogs
+            return self.render_rows(blogs, schemas.BlogSummary, fields)
         except SQLAlchemyError as e:
-            logger.error(f"Error getting blog: {str(e)}")
+            logger.error("Error getting blog: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error getting blog")
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error getting blog: {str(e)}")
+            logger.error("Error getting blog: %s", e)
             raise HTTPException(status_code=500, detail="Error getting blog")
         
 
@@ -318,7 +380,7 @@ class BlogService(BaseService):
         """
         blog = self.db.query(Blog).filter(Blog.id == blog_id).first()
         if not blog:
-            logger.warning(f"Blog not found for like: {blog_id}")
+            logger.warning("Blog not found for like: %s", blog_id)
             raise HTTPException(status_code=404, detail="Blog not found")
         
         existing_like = self.db.query(BlogLike).filter(
@@ -326,12 +388,13 @@ class BlogService(BaseService):
             BlogLike.user_id == self.current_user.id
         ).first()
         if existing_like:
-            logger.info(f"User {self.current_user.id} already liked blog {blog_id}")
+            logger.info("User %s already liked blog %s", self.current_user.id, blog_id)
             raise HTTPException(status_code=400, detail="You have already liked this blog")
         new_like = BlogLike(blog_id=blog_id, user_id=self.current_user.id)
         self.db.add(new_like)
         self.db.commit()
-        logger.info(f"User {self.current_user.id} liked blog {blog_id}")
+        broker.publish(blog_id, "blog.liked", {"blog_id": blog_id, "user_id": self.current_user.id})
+        logger.info("User %s liked blog %s", self.current_user.id, blog_id)
         return {"detail": f"Blog with id({blog_id}) has been liked"}
     
     def unlike_blog(self, blog_id: int) -> dict:
@@ -340,7 +403,7 @@ class BlogService(BaseService):
         try:
             blog = self.db.query(Blog).filter(Blog.id == blog_id).first()
             if not blog:
-                logger.warning(f"Blog not found for unlike: {blog_id}")
+                logger.warning("Blog not found for unlike: %s", blog_id)
                 raise HTTPException(status_code=404, detail="Blog not found")
             
             existing_like = self.db.query(BlogLike).filter(
@@ -348,14 +411,15 @@ class BlogService(BaseService):
                 BlogLike.user_id == self.current_user.id
             ).first()
             if not existing_like:
-                logger.info(f"User {self.current_user.id} has not liked blog {blog_id}")
+                logger.info("User %s has not liked blog %s", self.current_user.id, blog_id)
                 raise HTTPException(status_code=400, detail="You have not liked this blog")
             
             self.db.delete(existing_like)
             self.db.commit()
-            logger.info(f"User {self.current_user.id} unliked blog {blog_id}")
+            broker.publish(blog_id, "blog.unliked", {"blog_id": blog_id, "user_id": self.current_user.id})
+            logger.info("User %s unliked blog %s", self.current_user.id, blog_id)
             return {"detail": f"Blog with id({blog_id}) has been unliked"}
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Error unliking blog: {str(e)}")
+            logger.error("Error unliking blog: %s", e)
             raise HTTPException(status_code=500, detail="Error unliking blog")
\ No newline at end of file
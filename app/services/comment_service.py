@@ -1,30 +1,50 @@
 import logging
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
 from app.db.models import Comment, Blog, CommentLike
 from app.db import schemas
-from typing import Optional
+from app.config import settings
+from app.events import broker
+from typing import List, Optional, Set
 
 from app.services.base_service import BaseService
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# likes_count is served from the denormalized comments.like_count column
+COMMENT_COUNTS = {
+    "likes_count": lambda: Comment.like_count,
+}
+
+
+def path_segment(comment_id: int) -> str:
+    # Fixed-width ids keep lexicographic path order equal to (parent, id) order
+    return f"{comment_id:010d}/"
+
+
+def subtree_upper_bound(path: str) -> str:
+    # Every descendant path starts with "<path>", and "/" sorts just below "0",
+    # so [path, upper) covers the whole subtree and nothing else. This needs the
+    # binary collation Comment.path is declared with (COMMENT_PATH_TYPE)
+    return path[:-1] + "0"
+
 class CommentService(BaseService):
     
-    def comment_on_blog(self, request: schemas.CreateComment, blog_id) -> schemas.CreateComment:
+    def comment_on_blog(self, request: schemas.CreateComment, blog_id) -> schemas.GetComment:
         """
-        Add a comment to a blog post.
+        Add a comment to a blog post, or a reply to another comment when `parent_id` is set.
 
         Args:
             request (schemas.CreateComment): The comment data.
             blog_id (int): The ID of the blog to comment on.
 
         Returns:
-            schemas.CreateComment: The created comment.
+            schemas.GetComment: The created comment.
 
         Raises:
-            HTTPException: If the blog does not exist or an error occurs.
+            HTTPException: If the blog or parent comment does not exist, the thread is too deep, or an error occurs.
         """
         try:
             
@@ -32,27 +52,45 @@ class CommentService(BaseService):
             if not blog:
                 raise HTTPException(
                     status_code=404, detail="Blog not found")
+
+            parent = None
+            if request.parent_id:
+                parent = self.db.query(Comment).filter(Comment.id == request.parent_id, Comment.blog_id == blog_id).first()
+                if not parent:
+                    raise HTTPException(status_code=404, detail="Parent comment not found")
+                if parent.depth + 1 > settings.COMMENT_MAX_DEPTH:
+                    raise HTTPException(status_code=400, detail=f"Replies cannot be nested deeper than {settings.COMMENT_MAX_DEPTH} levels")
             
-            new_comment = Comment(author_id=self.current_user.id, blog_id=blog_id, content= request.content)
+            new_comment = Comment(
+                author_id=self.current_user.id,
+                blog_id=blog_id,
+                content=request.content,
+                parent_id=parent.id if parent else None,
+                depth=parent.depth + 1 if parent else 0,
+            )
 
             self.db.add(new_comment)
+            self.db.flush()  # the path ends with the comment's own id
+            new_comment.path = (parent.path if parent else "") + path_segment(new_comment.id)
             self.db.commit()
             self.db.refresh(new_comment)
 
+            broker.publish(blog_id, "comment.created", schemas.GetComment.model_validate(new_comment).model_dump(mode="json"))
             return new_comment
         
         except SQLAlchemyError as e:
-            logger.error(f"Error creating comment: {str(e)}")
+            self.db.rollback()
+            logger.error("Error creating comment: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error creating comment")
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error creating comment: {str(e)}")
+            logger.error("Error creating comment: %s", e)
             raise HTTPException(
                 status_code=500, detail="Error creating comment") 
     
-    def get_comments(self, author_id: int, blog_id: int, include_all: Optional[bool] = None):
+    def get_comments(self, author_id: int, blog_id: int, include_all: Optional[bool] = None, fields: Optional[Set[str]] = None, sort: Optional[str] = None, limit: Optional[int] = None):
         """
         Retrieve comments for a blog post.
 
@@ -60,40 +98,156 @@ class CommentService(BaseService):
             author_id (int): The ID of the comment author.
             blog_id (int): The ID of the blog.
             include_all (Optional[bool]): Whether to include all comments.
+            fields (Optional[Set[str]]): Sparse fieldset to select and return. Defaults to every field.
+            sort (Optional[str]): "top" returns the most-liked comments first, read straight off the like-count index.
+            limit (Optional[int]): Maximum number of comments for sort=top. Defaults to TOP_COMMENTS_LIMIT.
 
         Returns:
-            List[schemas.Comment]: A list of comments.
+            List[schemas.GetComment]: A list of comments (dicts narrowed to `fields` when given).
 
         Raises:
             HTTPException: If no comments are found or an error occurs.
         """
         try:
+            query = self.db.query(*self.select_fields(Comment, schemas.GetComment, fields, COMMENT_COUNTS))
             if author_id:
-                comments = self.db.query(Comment).filter(Comment.blog_id == blog_id, Comment.author_id == author_id).all()
+                query = query.filter(Comment.blog_id == blog_id, Comment.author_id == author_id)
             elif include_all is True:
-                comments = self.db.query(Comment).filter(Comment.blog_id == blog_id).all()
+                query = query.filter(Comment.blog_id == blog_id)
             else:
-                comments = self.db.query(Comment).filter(Comment.blog_id == blog_id, Comment.author_id == self.current_user.id).all()
+                query = query.filter(Comment.blog_id == blog_id, Comment.author_id == self.current_user.id)
+
+            if sort == "top":
+                query = query.order_by(Comment.like_count.desc(), Comment.id.desc()).limit(limit or settings.TOP_COMMENTS_LIMIT)
+            comments = query.all()
             
             if not comments:
                 raise HTTPException(status_code=404, detail="No comments found")
             
-            return [
-                schemas.GetComment(
-                    **{k: v for k, v in comment.__dict__.items() if not k.startswith('_')},
-                    likes_count=len(comment.likes) if  hasattr(comment, 'likes') and comment.likes else 0
-                )   
-                for comment in comments
-            ]
+            return self.render_rows(comments, schemas.GetComment, fields, self.liked_ids(CommentLike.comment_id, comments, fields))
         except SQLAlchemyError as e:
-            logger.error(f"Error getting comments: {str(e)}")
+            logger.error("Error getting comments: %s", e)
             raise HTTPException(status_code=500, detail="Error getting comments")
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"Error getting comments: {str(e)}")
+            logger.error("Error getting comments: %s", e)
             raise HTTPException(status_code=500, detail="Error getting comments")
     
+    def _build_tree(self, rows) -> List[schemas.CommentNode]:
+        # Rows arrive in path order (pre-order), so every parent is seen before its replies
+        items = self.render_rows(rows, schemas.GetComment, liked=self.liked_ids(CommentLike.comment_id, rows))
+        nodes = {}
+        roots = []
+        for item in items:
+            node = schemas.CommentNode(**item.model_dump())
+            nodes[node.id] = node
+            parent = nodes.get(node.parent_id)
+            (parent.replies if parent else roots).append(node)
+        return roots
+
+    def get_thread(self, comment_id: int, max_depth: Optional[int] = None, branches: Optional[int] = None) -> schemas.CommentNode:
+        """
+        Retrieve a comment and its replies as a nested thread.
+
+        The subtree is read with one range query over the materialized path, never level by level.
+
+        Args:
+            comment_id (int): The ID of the comment at the root of the thread.
+            max_depth (Optional[int]): How many levels of replies to include below the root. Defaults to all.
+            branches (Optional[int]): Only include the first N direct replies (and their subtrees).
+
+        Returns:
+            schemas.CommentNode: The root comment with its replies nested under it.
+
+        Raises:
+            HTTPException: If the comment does not exist or an error occurs.
+        """
+        try:
+            root = self.db.query(Comment.blog_id, Comment.path, Comment.depth).filter(Comment.id == comment_id).first()
+            if not root:
+                raise HTTPException(status_code=404, detail="Comment not found")
+
+            upper = subtree_upper_bound(root.path)
+            if branches:
+                # The (N+1)th direct reply's path is where the first N branches end
+                cutoff = (
+                    self.db.query(Comment.path)
+                    .filter(Comment.blog_id == root.blog_id, Comment.path > root.path, Comment.path < upper, Comment.depth == root.depth + 1)
+                    .order_by(Comment.path)
+                    .offset(branches)
+                    .limit(1)
+                    .scalar()
+                )
+                upper = cutoff or upper
+
+            query = (
+                self.db.query(*self.select_fields(Comment, schemas.GetComment, None, COMMENT_COUNTS))
+                .filter(Comment.blog_id == root.blog_id, Comment.path >= root.path, Comment.path < upper)
+            )
+            if max_depth is not None:
+                query = query.filter(Comment.depth <= root.depth + max_depth)
+
+            return self._build_tree(query.order_by(Comment.path).all())[0]
+
+        except SQLAlchemyError as e:
+            logger.error("Error getting comment thread: %s", e)
+            raise HTTPException(status_code=500, detail="Error getting comment thread")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Error getting comment thread: %s", e)
+            raise HTTPException(status_code=500, detail="Error getting comment thread")
+
+    def get_threads(self, blog_id: int, limit: Optional[int] = None, after: Optional[str] = None, max_depth: Optional[int] = None) -> schemas.CommentThreadPage:
+        """
+        Retrieve a page of top-level comments on a blog, each with its replies nested.
+
+        One query picks the page of top-level comments and a second reads all of their
+        replies as a single path range, whatever the depth.
+
+        Args:
+            blog_id (int): The ID of the blog.
+            limit (Optional[int]): Number of top-level threads per page. Defaults to COMMENT_THREADS_PAGE_SIZE.
+            after (Optional[str]): The `next_cursor` from the previous page.
+            max_depth (Optional[int]): How many levels of replies to include. Defaults to all.
+
+        Returns:
+            schemas.CommentThreadPage: The threads and the cursor for the next page.
+
+        Raises:
+            HTTPException: If an error occurs.
+        """
+        try:
+            limit = limit or settings.COMMENT_THREADS_PAGE_SIZE
+            roots = self.db.query(Comment.path).filter(Comment.blog_id == blog_id, Comment.depth == 0)
+            if after:
+                roots = roots.filter(Comment.path > after)
+            root_paths = [row.path for row in roots.order_by(Comment.path).limit(limit + 1).all()]
+            has_more = len(root_paths) > limit
+            root_paths = root_paths[:limit]
+            if not root_paths:
+                return schemas.CommentThreadPage(threads=[])
+
+            query = (
+                self.db.query(*self.select_fields(Comment, schemas.GetComment, None, COMMENT_COUNTS))
+                .filter(Comment.blog_id == blog_id, Comment.path >= root_paths[0], Comment.path < subtree_upper_bound(root_paths[-1]))
+            )
+            if max_depth is not None:
+                query = query.filter(Comment.depth <= max_depth)
+
+            return schemas.CommentThreadPage(
+                threads=self._build_tree(query.order_by(Comment.path).all()),
+                next_cursor=root_paths[-1] if has_more else None,
+            )
+
+        except SQLAlchemyError as e:
+            logger.error("Error getting comment threads: %s", e)
+            raise HTTPException(status_code=500, detail="Error getting comment threads")
+        except Exception as e:
+            logger.error("Error getting comment threads: %s", e)
+            raise HTTPException(status_code=500, detail="Error getting comment threads")
+
     def like_comment(self, comment_id: int) -> dict:
         """
         Like a comment by its ID.
@@ -118,21 +272,27 @@ class CommentService(BaseService):
             self.db.commit()
             self.db.refresh(comment)
 
+            blog_id = comment.blog_id
             new_like = CommentLike(comment_id=comment_id, user_id=self.current_user.id)
             self.db.add(new_like)
+            # Atomic in-database increment, so concurrent likes can't lose updates
+            self.db.query(Comment).filter(Comment.id == comment_id).update(
+                {Comment.like_count: Comment.like_count + 1}, synchronize_session=False
+            )
             self.db.commit()
 
+            broker.publish(blog_id, "comment.liked", {"comment_id": comment_id, "user_id": self.current_user.id})
             return {"detail": f"Comment with id({comment_id}) has been liked"}
         
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Error liking comment: {str(e)}")
+            logger.error("Error liking comment: %s", e)
             raise HTTPException(status_code=500, detail="Error liking comment")
         except HTTPException:
             raise
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Error liking comment: {str(e)}")
+            logger.error("Error liking comment: %s", e)
             raise HTTPException(status_code=500, detail="Error liking comment")
         
     def unlike_comment(self, comment_id: int) -> dict:
@@ -160,20 +320,25 @@ class CommentService(BaseService):
             self.db.commit()
             self.db.refresh(comment)
 
+            blog_id = comment.blog_id
             self.db.delete(existing_like)
+            self.db.query(Comment).filter(Comment.id == comment_id).update(
+                {Comment.like_count: Comment.like_count - 1}, synchronize_session=False
+            )
             self.db.commit()
 
+            broker.publish(blog_id, "comment.unliked", {"comment_id": comment_id, "user_id": self.current_user.id})
             return {"detail": f"Comment with id({comment_id}) has been unliked"}
         
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Error unliking comment: {str(e)}")
+            logger.error("Error unliking comment: %s", e)
             raise HTTPException(status_code=500, detail="Error unliking comment")
         except HTTPException:
             raise
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Error unliking comment: {str(e)}")
+            logger.error("Error unliking comment: %s", e)
             raise HTTPException(status_code=500, detail="Error unliking comment")
             
     def update_comment(self, request: schemas.CommentUpdate, comment_id)  -> schemas.CommentUpdate:
@@ -200,17 +365,18 @@ class CommentService(BaseService):
             comment.content = request.content
             self.db.commit()
             self.db.refresh(comment)
+            broker.publish(comment.blog_id, "comment.updated", {"id": comment.id, "content": comment.content})
             return comment
         
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Error updating comments: {str(e)}")
+            logger.error("Error updating comments: %s", e)
             raise HTTPException(status_code=500, detail="Error updating comment")
         except HTTPException:
             raise
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Error updating comments: {str(e)}")
+            logger.error("Error updating comments: %s", e)
             raise HTTPException(status_code=500, detail="Error updating comment")
     
     def delete_comment(self, comment_id: int):
@@ -233,18 +399,26 @@ class CommentService(BaseService):
             if comment.author_id != self.current_user.id:
                 raise HTTPException(status_code=403, detail="You are not authorized to delete this comment")
             
-            self.db.delete(comment)
+            # Replies go with the comment: two bulk DELETEs over the subtree's path range
+            in_subtree = (Comment.blog_id == comment.blog_id, Comment.path >= comment.path, Comment.path < subtree_upper_bound(comment.path))
+            self.db.query(CommentLike).filter(
+                CommentLike.comment_id.in_(select(Comment.id).where(*in_subtree))
+            ).delete(synchronize_session=False)
+            blog_id = comment.blog_id
+            self.db.query(Comment).filter(*in_subtree).delete(synchronize_session=False)
             self.db.commit()
 
+            broker.publish(blog_id, "comment.deleted", {"id": comment_id})
+
             return {"detail": f"Comment with id({comment_id}) has been deleted"}
         
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Error deleting comment: {str(e)}")
+            logger.error("Error deleting comment: %s", e)
             raise HTTPException(status_code=500, detail="Error deleting comment")
         except HTTPException:
             raise
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Error deleting comment: {str(e)}")
+            logger.error("Error deleting comment: %s", e)
             raise HTTPException(status_code=500, detail="Error deleting comment")
\ No newline at end of file
@@ -0,0 +1,215 @@
+import heapq
+import logging
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+EdgeArrays = Tuple[array, array]  # (sources, targets), parallel int32 buffers
+
+
+class _Adjacency:
+    """
+    Compressed sparse row adjacency plus a small write overlay.
+
+    `targets[offsets[u]:offsets[u + 1]]` are u's neighbours as of the last build; edges
+    added or removed since then live in the `added`/`removed` sets until the next rebuild.
+    """
+
+    def __init__(self, offsets: array, targets: array):
+        self.offsets = offsets
+        self.targets = targets
+        self.added: Dict[int, Set[int]] = {}
+        self.removed: Dict[int, Set[int]] = {}
+
+    @classmethod
+    def from_edges(cls, sources: array, targets: array) -> "_Adjacency":
+        # Counting sort by source: two passes, no per-node Python lists
+        node_count = max(sources) + 1 if sources else 0
+        offsets = array('q', bytes(8 * (node_count + 1)))
+        for source in sources:
+            offsets[source + 1] += 1
+        for node in range(node_count):
+            offsets[node + 1] += offsets[node]
+        cursor = array('q', offsets)
+        ordered = array('i', bytes(4 * len(targets)))
+        for source, target in zip(sources, targets):
+            ordered[cursor[source]] = target
+            cursor[source] += 1
+        return cls(offsets, ordered)
+
+    def neighbors(self, node: int):
+        if 0 <= node < len(self.offsets) - 1:
+            base = self.targets[self.offsets[node]:self.offsets[node + 1]]
+        else:
+            base = ()
+        removed = self.removed.get(node)
+        added = self.added.get(node)
+        if not removed and not added:
+            return base
+        result = [target for target in base if target not in removed] if removed else list(base)
+        if added:
+            present = set(result)
+            result.extend(target for target in added if target not in present)
+        return result
+
+    def _in_base(self, source: int, target: int) -> bool:
+        if not 0 <= source < len(self.offsets) - 1:
+            return False
+        try:
+            self.targets.index(target, self.offsets[source], self.offsets[source + 1])
+            return True
+        except ValueError:
+            return False
+
+    # The overlay is kept relative to the base, so applying the same write twice (as the
+    # load journal replay can) leaves the same state as applying it once
+    def add(self, source: int, target: int):
+        self.removed.get(source, set()).discard(target)
+        if not self._in_base(source, target):
+            self.added.setdefault(source, set()).add(target)
+
+    def remove(self, source: int, target: int):
+        self.added.get(source, set()).discard(target)
+        if self._in_base(source, target):
+            self.removed.setdefault(source, set()).add(target)
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.itemsize * len(self.offsets) + self.targets.itemsize * len(self.targets)
+
+
+class FollowGraph:
+    """
+    In-memory follow graph answering 2-hop queries without self-joins on `follows`.
+
+    Both directions are kept (following and followers). It is loaded in the background
+    at startup, patched in place by follow/unfollow on this worker, and periodically
+    rebuilt from the database to pick up writes made by other workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._out = _Adjacency(array('q', [0]), array('i'))  # follower -> followed
+        self._in = _Adjacency(array('q', [0]), array('i'))   # followed -> follower
+        self._journal: Optional[List[Tuple[bool, int, int]]] = None
+        self._thread: Optional[threading.Thread] = None
+        self.ready = False
+        self.edge_count = 0
+
+    def load(self, load_edges: Callable[[], EdgeArrays]):
+        """
+        Replace the graph with the edges `load_edges` reads, keeping writes that raced the load.
+
+        The journal opens before `load_edges` runs, so a follow committed after the read's
+        snapshot but applied before the swap is replayed rather than lost.
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            sources, targets = load_edges()
+            out_adjacency = _Adjacency.from_edges(sources, targets)
+            in_adjacency = _Adjacency.from_edges(targets, sources)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._out, self._in = out_adjacency, in_adjacency
+            for is_add, follower_id, followed_id in journal:
+                self._apply(is_add, follower_id, followed_id)
+            self.edge_count = len(sources)
+            self.ready = True
+
+    def _apply(self, is_add: bool, follower_id: int, followed_id: int):
+        if is_add:
+            self._out.add(follower_id, followed_id)
+            self._in.add(followed_id, follower_id)
+        else:
+            self._out.remove(follower_id, followed_id)
+            self._in.remove(followed_id, follower_id)
+
+    def add_edge(self, follower_id: int, followed_id: int):
+        with self._lock:
+            self._apply(True, follower_id, followed_id)
+            if self._journal is not None:
+                self._journal.append((True, follower_id, followed_id))
+
+    def remove_edge(self, follower_id: int, followed_id: int):
+        with self._lock:
+            self._apply(False, follower_id, followed_id)
+            if self._journal is not None:
+                self._journal.append((False, follower_id, followed_id))
+
+    def following(self, user_id: int) -> List[int]:
+        with self._lock:
+            return list(self._out.neighbors(user_id))
+
+    def followers(self, user_id: int) -> List[int]:
+        with self._lock:
+            return list(self._in.neighbors(user_id))
+
+    def suggestions(self, user_id: int, limit: int = 20) -> List[Tuple[int, int]]:
+        """
+        Friends-of-friends ranked by overlap.
+
+        Returns:
+            List[Tuple[int, int]]: (user_id, number of the user's followees who follow them), best first.
+        """
+        with self._lock:
+            following = self._out.neighbors(user_id)
+            overlap = Counter()
+            for followed_id in following:
+                overlap.update(self._out.neighbors(followed_id))
+        for excluded in set(following) | {user_id}:
+            overlap.pop(excluded, None)
+        return heapq.nlargest(limit, overlap.items(), key=lambda item: (item[1], -item[0]))
+
+    def mutual_followers(self, user_id: int, other_id: int) -> List[int]:
+        """Users who follow both `user_id` and `other_id`."""
+        with self._lock:
+            first = self._in.neighbors(user_id)
+            second = self._in.neighbors(other_id)
+        if len(first) > len(second):
+            first, second = second, first
+        candidates = set(first)
+        return [follower_id for follower_id in second if follower_id in candidates]
+
+    @property
+    def nbytes(self) -> int:
+        return self._out.nbytes + self._in.nbytes
+
+    def start(self, load_edges: Callable[[], EdgeArrays], refresh_seconds: float = settings.FOLLOW_GRAPH_REFRESH_SECONDS):
+        """Load in a daemon thread and rebuild every `refresh_seconds`; the app serves meanwhile."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                started = time.perf_counter()
+                try:
+                    self.load(load_edges)
+                    logger.info("Follow graph loaded: %s edges, %s KiB in %.2fs", self.edge_count, self.nbytes // 1024, time.perf_counter() - started)
+                except Exception as e:
+                    logger.error("Error loading follow graph: %s", e)
+                time.sleep(refresh_seconds)
+
+        self._thread = threading.Thread(target=run, name="follow-graph", daemon=True)
+        self._thread.start()
+
+
+def edges_from_pairs(pairs: Iterable[Tuple[int, int]]) -> EdgeArrays:
+    sources, targets = array('i'), array('i')
+    for source, target in pairs:
+        sources.append(source)
+        targets.append(target)
+    return sources, targets
+
+
+follow_graph = FollowGraph()
@@ -1,10 +1,16 @@
 import logging
-from sqlalchemy.exc import SQLAlchemyError
+from datetime import datetime, timezone
+from sqlalchemy import insert, delete, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from fastapi import HTTPException
 from app.db.models import User, Follow
+from app.db.database import SessionLocal
 from app.db import schemas
-from typing import List, Optional
+from typing import List, Optional, Set
 from app.services.base_service import BaseService
+from app.services.follow_graph import follow_graph, edges_from_pairs, EdgeArrays
+from app.cache import user_stats_cache, followee_cache
+from app.config import settings
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -24,11 +30,11 @@ class FollowService(BaseService):
         Raises:
             HTTPException: If the user does not exist or is already followed.
         """
-        logger.info(f"Attempting to follow user with ID {user_id}")
+        logger.info("Attempting to follow user with ID %s", user_id)
         try:
-            user_to_follow = self.db.query(User).filter(User.id == user_id).first()
+            user_to_follow = self.db.query(User).filter(User.id == user_id, User.deleted_at.is_(None)).first()
             if not user_to_follow:
-                logger.warning(f"User with ID {user_id} not found")
+                logger.warning("User with ID %s not found", user_id)
                 raise HTTPException(status_code=404, detail="User not found")
 
             # Check if already following
@@ -36,19 +42,26 @@ class FollowService(BaseService):
                 follower_id=self.current_user.id, followed_id=user_id
             ).first()
             if existing_follow:
-                logger.warning(f"User with ID {user_id} is already followed by user {self.current_user.id}")
+                logger.warning("User with ID %s is already followed by user %s", user_id, self.current_user.id)
                 raise HTTPException(status_code=400, detail="You are already following this user.")
 
             # Create new follow relationship
             new_follow = Follow(follower_id=self.current_user.id, followed_id=user_id)
             self.db.add(new_follow)
             self.db.commit()
-            logger.info(f"User with ID {user_id} successfully followed by user {self.current_user.id}")
+            user_stats_cache.invalidate(self.current_user.id, user_id)
+            followee_cache.invalidate(self.current_user.id)
+            follow_graph.add_edge(self.current_user.id, user_id)
+            logger.info("User with ID %s successfully followed by user %s", user_id, self.current_user.id)
             return {"detail": f"User with id({user_id}) has been followed"}
 
+        except IntegrityError:
+            # A concurrent request inserted the same edge first (uq_follows_follower_id_followed_id)
+            self.db.rollback()
+            raise HTTPException(status_code=400, detail="You are already following this user.")
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Database error while following user with ID {user_id}: {e}")
+            logger.error("Database error while following user with ID %s: %s", user_id, e)
             raise HTTPException(status_code=500, detail="Error following user")
 
     def unfollow_user(self, user_id: int):
@@ -64,12 +77,12 @@ class FollowService(BaseService):
         Raises:
             HTTPException: If the user does not exist or is not currently followed.
         """
-        logger.info(f"Attempting to unfollow user with ID {user_id}")
+        logger.info("Attempting to unfollow user with ID %s", user_id)
         try:
             # Check if the user to unfollow exists
             user_to_unfollow = self.db.query(User).filter(User.id == user_id).first()
             if not user_to_unfollow:
-                logger.warning(f"User with ID {user_id} not found")
+                logger.warning("User with ID %s not found", user_id)
                 raise HTTPException(status_code=404, detail="User not found")
 
             # Check if following exists
@@ -77,42 +90,47 @@ class FollowService(BaseService):
                 follower_id=self.current_user.id, followed_id=user_id
             ).first()
             if not existing_follow:
-                logger.warning(f"User with ID {user_id} is not currently followed by user {self.current_user.id}")
+                logger.warning("User with ID %s is not currently followed by user %s", user_id, self.current_user.id)
                 raise HTTPException(status_code=400, detail="You are not following this user.")
 
             # Delete follow relationship
             self.db.delete(existing_follow)
             self.db.commit()
-            logger.info(f"User with ID {user_id} successfully unfollowed by user {self.current_user.id}")
+            user_stats_cache.invalidate(self.current_user.id, user_id)
+            followee_cache.invalidate(self.current_user.id)
+            follow_graph.remove_edge(self.current_user.id, user_id)
+            logger.info("User with ID %s successfully unfollowed by user %s", user_id, self.current_user.id)
             return {"detail": f"User with id({user_id}) has been unfollowed"}
 
         except SQLAlchemyError as e:
             self.db.rollback()
-            logger.error(f"Database error while unfollowing user with ID {user_id}: {e}")
+            logger.error("Database error while unfollowing user with ID %s: %s", user_id, e)
             raise HTTPException(status_code=500, detail="Error unfollowing user")
     
-    def get_following(self, alt_user: Optional[int] = None) -> List[schemas.UserSummary]:
+    def get_following(self, alt_user: Optional[int] = None, fields: Optional[Set[str]] = None) -> List[schemas.UserSummary]:
         """
         Get the list of users the current user or another user is following.
 
         Args:
             alt_user (Optional[int]): The ID of the user to check. Defaults to the current user.
+            fields (Optional[Set[str]]): Sparse fieldset to select and return. Defaults to every field.
 
         Returns:
-            List[schemas.UserSummary]: A list of users being followed.
+            List[schemas.UserSummary]: A list of users being followed (dicts narrowed to `fields` when given).
 
         Raises:
             HTTPException: If an error occurs while retrieving the data.
         """
         try:
+            query = self.db.query(*self.select_fields(User, schemas.UserSummary, fields))
             if alt_user:
-                following = self.db.query(User).join(Follow, Follow.followed_id == User.id).filter(Follow.follower_id == alt_user).all()
+                following = query.join(Follow, Follow.followed_id == User.id).filter(Follow.follower_id == alt_user, User.deleted_at.is_(None)).all()
             else:
-                following = self.db.query(User).join(Follow, Follow.followed_id == User.id).filter(Follow.follower_id == self.current_user.id).all()
+                following = query.join(Follow, Follow.followed_id == User.id).filter(Follow.follower_id == self.current_user.id, User.deleted_at.is_(None)).all()
             if not following:
                 return []
             
-            return following
+            return self.render_rows(following, schemas.UserSummary, fields)
         
         except SQLAlchemyError as e:
             self.db.rollback()
@@ -127,28 +145,30 @@ class FollowService(BaseService):
             raise HTTPException(
                 status_code=500, detail="Error getting following")
     
-    def get_followers(self, alt_user: Optional[int] = None) -> List[schemas.UserSummary]:
+    def get_followers(self, alt_user: Optional[int] = None, fields: Optional[Set[str]] = None) -> List[schemas.UserSummary]:
         """
         Get the list of followers for the current user or another user.
 
         Args:
             alt_user (Optional[int]): The ID of the user to check. Defaults to the current user.
+            fields (Optional[Set[str]]): Sparse fieldset to select and return. Defaults to every field.
 
         Returns:
-            List[schemas.UserSummary]: A list of followers.
+            List[schemas.UserSummary]: A list of followers (dicts narrowed to `fields` when given).
 
         Raises:
             HTTPException: If an error occurs while retrieving the data.
         """
         try:
+            query = self.db.query(*self.select_fields(User, schemas.UserSummary, fields))
             if alt_user:
-                followers = self.db.query(User).join(Follow, Follow.follower_id == User.id).filter(Follow.followed_id == alt_user).all()
+                followers = query.join(Follow, Follow.follower_id == User.id).filter(Follow.followed_id == alt_user, User.deleted_at.is_(None)).all()
             else:
-                followers = self.db.query(User).join(Follow, Follow.follower_id == User.id).filter(Follow.followed_id == self.current_user.id).all()
+                followers = query.join(Follow, Follow.follower_id == User.id).filter(Follow.followed_id == self.current_user.id, User.deleted_at.is_(None)).all()
             if not followers:
                 return []
             
-            return followers
+            return self.render_rows(followers, schemas.UserSummary, fields)
         
         except SQLAlchemyError as e:
             self.db.rollback()
@@ -161,4 +181,249 @@ class FollowService(BaseService):
             self.db.rollback()
             print(f"Error getting followers: {str(e)}")
             raise HTTPException(
-                status_code=500, detail="Error getting followers")
\ No newline at end of file
+                status_code=500, detail="Error getting followers")
+
+    def follow_users(self, user_ids: List[int]) -> schemas.BulkFollowResult:
+        """
+        Follow many users at once, e.g. when importing contacts during onboarding.
+
+        Existence and already-followed checks are one query each and the new edges go in
+        as a single multi-row INSERT, whatever the number of IDs.
+
+        Args:
+            user_ids (List[int]): The IDs of the users to follow. Duplicates are ignored.
+
+        Returns:
+            schemas.BulkFollowResult: The IDs followed, already followed, and not found.
+
+        Raises:
+            HTTPException: If an error occurs while following the users.
+        """
+        me = self.current_user.id
+        wanted = list(dict.fromkeys(user_ids))
+        logger.info("Attempting to bulk follow %s users for user %s", len(wanted), me)
+        try:
+            existing = {row[0] for row in self.db.query(User.id).filter(User.id.in_(wanted), User.deleted_at.is_(None)).all()}
+            already = {
+                row[0] for row in self.db.query(Follow.followed_id)
+                .filter(Follow.follower_id == me, Follow.followed_id.in_(wanted)).all()
+            }
+            to_follow = [user_id for user_id in wanted if user_id in existing and user_id not in already]
+
+            followed = []
+            if to_follow:
+                followed = self._insert_follows(me, to_follow)
+                already.update(user_id for user_id in to_follow if user_id not in followed)
+                if followed:
+                    user_stats_cache.invalidate(me, *followed)
+                    followee_cache.invalidate(me)
+                    for user_id in followed:
+                        follow_graph.add_edge(me, user_id)
+
+            logger.info("User %s bulk followed %s users", me, len(followed))
+            return schemas.BulkFollowResult(
+                followed=followed,
+                already_following=[user_id for user_id in wanted if user_id in already],
+                not_found=[user_id for user_id in wanted if user_id not in existing],
+            )
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error("Database error while bulk following for user %s: %s", me, e)
+            raise HTTPException(status_code=500, detail="Error following users")
+
+    def _insert_follows(self, me: int, user_ids: List[int]) -> List[int]:
+        """
+        Insert follow edges from `me` in one statement, and commit.
+
+        If a concurrent request followed one of the users after our check, the unique
+        (follower_id, followed_id) constraint rejects the whole statement; the rows are
+        then retried one by one, each in a savepoint, skipping the ones that conflict.
+
+        Returns:
+            List[int]: The IDs whose edge this call inserted.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            self.db.execute(insert(Follow).values([{"follower_id": me, "followed_id": user_id, "created_at": now} for user_id in user_ids]))
+            self.db.commit()
+            return user_ids
+        except IntegrityError:
+            self.db.rollback()
+
+        inserted = []
+        for user_id in user_ids:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(Follow).values(follower_id=me, followed_id=user_id, created_at=now))
+                inserted.append(user_id)
+            except IntegrityError:
+                logger.info("User %s already follows %s, skipped in bulk follow", me, user_id)
+        self.db.commit()
+        return inserted
+
+    def unfollow_users(self, user_ids: List[int]) -> schemas.BulkUnfollowResult:
+        """
+        Unfollow many users at once with a single DELETE.
+
+        Args:
+            user_ids (List[int]): The IDs of the users to unfollow. Duplicates are ignored.
+
+        Returns:
+            schemas.BulkUnfollowResult: The IDs unfollowed and the ones that weren't followed.
+
+        Raises:
+            HTTPException: If an error occurs while unfollowing the users.
+        """
+        me = self.current_user.id
+        wanted = list(dict.fromkeys(user_ids))
+        logger.info("Attempting to bulk unfollow %s users for user %s", len(wanted), me)
+        try:
+            followed = {
+                row[0] for row in self.db.query(Follow.followed_id)
+                .filter(Follow.follower_id == me, Follow.followed_id.in_(wanted)).all()
+            }
+            to_unfollow = [user_id for user_id in wanted if user_id in followed]
+
+            if to_unfollow:
+                self.db.execute(
+                    delete(Follow).where(Follow.follower_id == me, Follow.followed_id.in_(to_unfollow))
+                )
+                self.db.commit()
+                user_stats_cache.invalidate(me, *to_unfollow)
+                followee_cache.invalidate(me)
+                for user_id in to_unfollow:
+                    follow_graph.remove_edge(me, user_id)
+
+            logger.info("User %s bulk unfollowed %s users", me, len(to_unfollow))
+            return schemas.BulkUnfollowResult(
+                unfollowed=to_unfollow,
+                not_following=[user_id for user_id in wanted if user_id not in followed],
+            )
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error("Database error while bulk unfollowing for user %s: %s", me, e)
+            raise HTTPException(status_code=500, detail="Error unfollowing users")
+
+    def get_follow_status(self, user_ids: List[int]) -> List[schemas.FollowStatus]:
+        """
+        Tell whether the current user follows each of the given users, e.g. to render follow buttons.
+
+        The caller's followee set is read with one query on the (follower_id, followed_id)
+        index and cached until their next follow/unfollow, a followee deleting their account
+        or `FOLLOWEE_CACHE_SECONDS`. Deleted accounts are reported as not followed.
+
+        Args:
+            user_ids (List[int]): The IDs to check, in the order the results should follow.
+
+        Returns:
+            List[schemas.FollowStatus]: One entry per requested ID.
+
+        Raises:
+            HTTPException: If an error occurs while retrieving the data.
+        """
+        try:
+            followees = followee_cache.get(self.current_user.id)
+            if followees is None:
+                # Follows of deleted accounts stay until the purge reaches them; don't report those
+                rows = self.db.query(Follow.followed_id).join(User, User.id == Follow.followed_id).filter(Follow.follower_id == self.current_user.id, User.deleted_at.is_(None)).all()
+                followees = frozenset(row[0] for row in rows)
+                followee_cache.set(self.current_user.id, followees)
+            return [schemas.FollowStatus(id=user_id, following=user_id in followees) for user_id in user_ids]
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error("Error getting follow status: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error getting follow status")
+        except Exception as e:
+            self.db.rollback()
+            logger.error("Error getting follow status: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error getting follow status")
+
+    def _summaries_in_order(self, user_ids: List[int]) -> List[schemas.UserSummary]:
+        # One IN query, then put the rows back in the graph's ranking order
+        if not user_ids:
+            return []
+        rows = self.db.query(*self.select_fields(User, schemas.UserSummary)).filter(User.id.in_(user_ids), User.deleted_at.is_(None)).all()
+        by_id = {row.id: row for row in rows}
+        return self.render_rows([by_id[user_id] for user_id in user_ids if user_id in by_id], schemas.UserSummary)
+
+    def get_suggestions(self, limit: int = settings.FOLLOW_SUGGESTIONS_LIMIT) -> List[schemas.FollowSuggestion]:
+        """
+        Suggest users to follow: people followed by the users the current user follows,
+        ranked by how many of them do.
+
+        Args:
+            limit (int): Maximum number of suggestions to return.
+
+        Returns:
+            List[schemas.FollowSuggestion]: Suggested users with their overlap count, best first.
+
+        Raises:
+            HTTPException: If the follow graph hasn't finished loading or an error occurs.
+        """
+        if not follow_graph.ready:
+            raise HTTPException(status_code=503, detail="Follow graph is still loading, try again shortly")
+        try:
+            ranked = follow_graph.suggestions(self.current_user.id, limit)
+            users = {user.id: user for user in self._summaries_in_order([user_id for user_id, _ in ranked])}
+            return [
+                schemas.FollowSuggestion(user=users[user_id], mutual_count=overlap)
+                for user_id, overlap in ranked if user_id in users
+            ]
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error("Error getting follow suggestions: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error getting follow suggestions")
+        except Exception as e:
+            self.db.rollback()
+            logger.error("Error getting follow suggestions: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error getting follow suggestions")
+
+    def get_mutual_followers(self, user_id: int) -> List[schemas.UserSummary]:
+        """
+        Get the users who follow both the current user and another user.
+
+        Args:
+            user_id (int): The ID of the other user.
+
+        Returns:
+            List[schemas.UserSummary]: The shared followers.
+
+        Raises:
+            HTTPException: If the follow graph hasn't finished loading or an error occurs.
+        """
+        if not follow_graph.ready:
+            raise HTTPException(status_code=503, detail="Follow graph is still loading, try again shortly")
+        try:
+            return self._summaries_in_order(follow_graph.mutual_followers(self.current_user.id, user_id))
+
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            logger.error("Error getting mutual followers: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error getting mutual followers")
+        except Exception as e:
+            self.db.rollback()
+            logger.error("Error getting mutual followers: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error getting mutual followers")
+
+
+def load_follow_edges() -> EdgeArrays:
+    """Stream every follow edge into the array buffers the follow graph is built from."""
+    db = SessionLocal()
+    try:
+        deleted = select(User.id).where(User.deleted_at.isnot(None))
+        edges = db.query(Follow.follower_id, Follow.followed_id).filter(
+            Follow.follower_id.notin_(deleted), Follow.followed_id.notin_(deleted)
+        )
+        return edges_from_pairs(edges.yield_per(10000))
+    finally:
+        db.close()
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import schemas
+from app.db.models import User
+from app.storage import StorageBackend, get_storage
+
+logger = logging.getLogger(__name__)
+
+
+class MediaCollector:
+    """
+    Periodic job deleting stored media that no user references any more.
+
+    Failed deletes when a picture is replaced and purged accounts leave files behind.
+    The job reads the picture columns of live users in keyset batches into a set of
+    storage keys, then walks the backend's listing and deletes unreferenced files in
+    bulk batches. Files stored less than `grace_seconds` ago are left alone: their
+    upload may not be committed to the user row yet.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.MEDIA_GC_BATCH_SIZE,
+        grace_seconds: float = settings.MEDIA_GC_GRACE_SECONDS,
+        interval_seconds: float = settings.MEDIA_GC_INTERVAL_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.grace_seconds = grace_seconds
+        self.interval_seconds = interval_seconds
+        self._running = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _referenced_keys(self, db: Session, storage: StorageBackend) -> Set[str]:
+        keys = set()
+        last_id = 0
+        while True:
+            rows = (
+                db.query(User.id, User.profile_url, User.cover_photo_url, User.profile_variants, User.cover_photo_variants)
+                .filter(User.id > last_id, User.deleted_at.is_(None), or_(User.profile_url.isnot(None), User.cover_photo_url.isnot(None)))
+                .order_by(User.id)
+                .limit(self.batch_size)
+                .all()
+            )
+            if not rows:
+                return keys
+            for row in rows:
+                for url in (row.profile_url, row.cover_photo_url, *(row.profile_variants or {}).values(), *(row.cover_photo_variants or {}).values()):
+                    if url:
+                        keys.add(storage.key(url))
+            last_id = rows[-1].id
+
+    def run(self, db: Session, dry_run: bool = True, sample_size: int = 100) -> schemas.MediaGCReport:
+        """
+        Find, and unless `dry_run` delete, stored files no live user references.
+
+        Args:
+            db (Session): SQLAlchemy database session.
+            dry_run (bool): Only report what would be deleted.
+            sample_size (int): How many orphan URLs to list in the report.
+
+        Returns:
+            schemas.MediaGCReport: Counts for the run and a sample of the orphans.
+
+        Raises:
+            HTTPException: If a collection is already running in this worker.
+        """
+        if not self._running.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="A media collection is already running")
+        try:
+            storage = get_storage()
+            report = schemas.MediaGCReport(dry_run=dry_run, started_at=datetime.now(timezone.utc))
+            cutoff = report.started_at - timedelta(seconds=self.grace_seconds)
+            referenced = self._referenced_keys(db, storage)
+            report.referenced = len(referenced)
+
+            batch: List[str] = []
+            for url, stored_at in storage.list_files():
+                report.scanned += 1
+                if storage.key(url) in referenced:
+                    continue
+                if stored_at > cutoff:
+                    report.recent += 1
+                    continue
+                report.orphaned += 1
+                if len(report.orphans) < sample_size:
+                    report.orphans.append(url)
+                if not dry_run:
+                    batch.append(url)
+                    if len(batch) >= self.batch_size:
+                        storage.delete_many(batch)
+                        report.deleted += len(batch)
+                        batch = []
+            if batch:
+                storage.delete_many(batch)
+                report.deleted += len(batch)
+
+            report.finished_at = datetime.now(timezone.utc)
+            logger.info(
+                "Media collection%s: scanned %s, orphaned %s, deleted %s, too recent %s",
+                " (dry run)" if dry_run else "", report.scanned, report.orphaned, report.deleted, report.recent,
+            )
+            return report
+        finally:
+            self._running.release()
+
+    def start(self, session_factory: Callable[[], Session]):
+        """Run a collection every `interval_seconds` in a daemon thread."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.interval_seconds)
+                db = session_factory()
+                try:
+                    self.run(db, dry_run=False)
+                except Exception as e:
+                    logger.error("Error collecting orphaned media: %s", e)
+                finally:
+                    db.close()
+
+        self._thread = threading.Thread(target=run, name="media-gc", daemon=True)
+        self._thread.start()
+
+
+media_collector = MediaCollector()
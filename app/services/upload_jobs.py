@@ -0,0 +1,163 @@
+import logging
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.cache import TTLCache
+from app.config import settings
+from app.db import schemas
+from app.db.database import SessionLocal
+from app.db.models import User
+from app.images import image_pool, render_variants, remove_files, sniff_image_type
+from app.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Upload kind -> the User columns holding its URL and its derivatives' URLs
+UPLOAD_COLUMNS = {"profile_pic": ("profile_url", "profile_variants"), "cover_photo": ("cover_photo_url", "cover_photo_variants")}
+
+
+class UploadQueue:
+    """
+    Runs storage calls for uploads on a bounded worker pool, off the request threads.
+
+    The request only spools the file to disk and gets a job id back. At most `max_pending`
+    jobs are queued or running per worker process; beyond that new uploads are refused
+    with 503 rather than piling up temp files. Job records are kept for `job_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        workers: int = settings.UPLOAD_WORKERS,
+        max_pending: int = settings.UPLOAD_QUEUE_SIZE,
+        job_ttl: float = settings.UPLOAD_JOB_TTL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.jobs = TTLCache(ttl=job_ttl)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+
+    def submit(self, user_id: int, kind: str, file: UploadFile) -> schemas.UploadJob:
+        """
+        Spool `file` to a temp file and queue it for storage.
+
+        Args:
+            user_id (int): The ID of the uploading user.
+            kind (str): One of UPLOAD_COLUMNS.
+            file (UploadFile): The uploaded file; it is copied before the request ends.
+
+        Returns:
+            schemas.UploadJob: The queued job.
+
+        Raises:
+            HTTPException: If the file is not a supported image or the upload queue is full.
+        """
+        # Trust the file's leading bytes, not the client's Content-Type
+        content_type = sniff_image_type(file.file.read(12))
+        file.file.seek(0)
+        if content_type is None:
+            raise HTTPException(status_code=415, detail="Unsupported file type, upload a JPEG, PNG, GIF or WebP image")
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(status_code=503, detail="Too many uploads in progress, try again shortly")
+        try:
+            with tempfile.NamedTemporaryFile(prefix="upload-", dir=settings.UPLOAD_SPOOL_DIR, delete=False) as spool:
+                shutil.copyfileobj(file.file, spool, length=1024 * 1024)
+                path = spool.name
+        except Exception:
+            self._slots.release()
+            raise
+
+        job = schemas.UploadJob(id=uuid.uuid4().hex, user_id=user_id, kind=kind, status="queued", created_at=datetime.now(timezone.utc))
+        self.jobs.set(job.id, job)
+        self._executor.submit(self._run, job, path, content_type)
+        logger.info("Queued %s upload %s for user %s", kind, job.id, user_id)
+        return job
+
+    def _run(self, job: schemas.UploadJob, path: str, content_type: Optional[str]):
+        job.status = "running"
+        storage = get_storage()
+        db = self.session_factory()
+        rendered = {}
+        try:
+            # Thumbnails are CPU-bound, so they go to the process pool; this also rejects
+            # files that don't decode as images before anything is stored
+            rendered = image_pool().submit(render_variants, path, job.kind).result(timeout=settings.IMAGE_TIMEOUT_SECONDS)
+            url = storage.upload(path, content_type)
+            variants = {name: storage.upload(variant_path, "image/webp") for name, variant_path in rendered.items()}
+
+            user = db.query(User).filter(User.id == job.user_id).first()
+            if user is None:
+                self._release(db, url, variants)
+                raise ValueError("User no longer exists")
+            url_column, variants_column = UPLOAD_COLUMNS[job.kind]
+            previous, previous_variants = getattr(user, url_column), getattr(user, variants_column)
+            setattr(user, url_column, url)
+            setattr(user, variants_column, variants)
+            db.commit()
+            # Only drop the old files once nothing points at them
+            if previous and previous != url:
+                self._release(db, previous, previous_variants)
+            job.url = url
+            job.variants = variants
+            job.status = "done"
+            logger.info("Upload %s stored at %s", job.id, url)
+        except Exception as e:
+            db.rollback()
+            job.status = "failed"
+            job.error = str(e) or type(e).__name__
+            logger.error("Upload %s failed: %s", job.id, job.error)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            db.close()
+            remove_files([path, *rendered.values()])
+            self._slots.release()
+
+    @staticmethod
+    def _release(db: Session, url: str, variants: Optional[Dict[str, str]] = None):
+        # Content-addressed storage hands identical images the same URL, so a file may
+        # still belong to someone else. Derivatives follow their original.
+        in_use = db.query(User.id).filter(or_(User.profile_url == url, User.cover_photo_url == url)).first()
+        if in_use is None:
+            storage = get_storage()
+            for stored in [url, *(variants or {}).values()]:
+                storage.delete(stored)
+
+    def delete_later(self, url: str, variants: Optional[Dict[str, str]] = None):
+        """Remove a file and its derivatives from storage in the background, unless another user still references it."""
+        def run():
+            db = self.session_factory()
+            try:
+                self._release(db, url, variants)
+            except Exception as e:
+                logger.error("Error deleting %s from storage: %s", url, e)
+            finally:
+                db.close()
+        self._executor.submit(run)
+
+    def get(self, job_id: str, user_id: int) -> schemas.UploadJob:
+        job = self.jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            raise HTTPException(status_code=404, detail="Upload job not found")
+        return job
+
+    def status_counts(self) -> Dict[str, int]:
+        """Jobs still on record per status, for the upload_jobs gauge."""
+        counts = dict.fromkeys(("queued", "running", "done", "failed"), 0)
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+upload_queue = UploadQueue()
@@ -1,9 +1,17 @@
 import logging
+from datetime import datetime, timezone
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
-from app.db.models import User
+from app.db.models import User, Blog, BlogLike, Comment, Follow
+from app.cache import user_stats_cache, followee_cache
+from app.db.database import SessionLocal
+from app.services.username_index import username_index, UserRow
+from app.services.follow_graph import follow_graph
+from app.services.account_purge import account_purger
+from app.config import settings
 from app.db import schemas
-from typing import List, Optional
+from typing import Iterator, List, Optional, Set
 
 from app.routers import user
 from app.services.base_service import BaseService
@@ -14,31 +22,62 @@ logger = logging.getLogger(__name__)
 
 class UserService(BaseService):
 
-    def get_users(self) -> List[schemas.UserSummary]:
+    def get_users(self, fields: Optional[Set[str]] = None) -> List[schemas.UserSummary]:
         """
         Retrieve all users from the database.
 
+        Args:
+            fields (Optional[Set[str]]): Sparse fieldset to select and return. Defaults to every field.
+
         Returns:
-            List[schemas.UserSummary]: A list of all users.
+            List[schemas.UserSummary]: A list of all users (dicts narrowed to `fields` when given).
 
         Raises:
             HTTPException: If an error occurs while retrieving the data.
         """
         try:
-            users = self.db.query(User).all()
-            return users
+            users = self.db.query(*self.select_fields(User, schemas.UserSummary, fields)).filter(User.deleted_at.is_(None)).all()
+            return self.render_rows(users, schemas.UserSummary, fields)
         except (SQLAlchemyError, Exception) as e:
             self.db.rollback()
             print(f"Error deleting blog: {str(e)}")
             raise HTTPException(
             status_code=500, detail="Error fetching users")
 
-    def get_current_user(self, altId: Optional[int] = None) -> schemas.User:
+    def get_users_by_ids(self, ids: List[int]) -> List[schemas.UserBatchItem]:
+        """
+        Retrieve several users by ID in a single query.
+
+        Args:
+            ids (List[int]): The user IDs to retrieve, in the order the caller wants them back.
+
+        Returns:
+            List[schemas.UserBatchItem]: One entry per requested ID, carrying either the user or a per-id error.
+
+        Raises:
+            HTTPException: If an error occurs while retrieving the data.
+        """
+        try:
+            found = {user.id: user for user in self.db.query(User).filter(User.id.in_(ids), User.deleted_at.is_(None)).all()}
+            return [
+                schemas.UserBatchItem(id=user_id, status_code=200, user=schemas.UserSummary.model_validate(found[user_id]))
+                if user_id in found
+                else schemas.UserBatchItem(id=user_id, status_code=404, detail=f"User with id {user_id} not found")
+                for user_id in ids
+            ]
+        except (SQLAlchemyError, Exception) as e:
+            self.db.rollback()
+            logger.error("Error getting users by ids: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error fetching users")
+
+    def get_current_user(self, altId: Optional[int] = None, fields: Optional[Set[str]] = None) -> schemas.User:
         """
         Retrieve a user by their ID.
 
         Args:
             altId (Optional[int]): The ID of the user to retrieve. Defaults to the current user.
+            fields (Optional[Set[str]]): Sparse fieldset to select and return. Defaults to every field.
 
         Returns:
             schemas.User: The user data.
@@ -47,19 +86,84 @@ class UserService(BaseService):
             HTTPException: If the user does not exist or an error occurs.
         """
         try:
+            if fields:
+                user_id = altId or self.current_user.id
+                row = self.db.query(*self.select_fields(User, schemas.User, fields)).filter(User.id == user_id, User.deleted_at.is_(None)).first()
+                if not row:
+                    raise HTTPException(status_code=404, detail=f"User with id {altId} not found")
+                user = self.render_rows([row], schemas.User, fields)[0]
+                if "blogs" in fields:
+                    blogs = self.db.query(*self.select_fields(Blog, schemas.BlogSummary)).filter(Blog.author_id == user_id).all()
+                    user["blogs"] = self.render_rows(blogs, schemas.BlogSummary)
+                return user
+
             if altId:
-                user = self.db.query(User).filter(User.id == altId).first()
+                user = self.db.query(User).filter(User.id == altId, User.deleted_at.is_(None)).first()
             else:
                 user = self.current_user
             if not user:
                 raise HTTPException(status_code=404, detail=f"User with id {altId} not found")
             return user
+        except HTTPException:
+            raise
         except (SQLAlchemyError, Exception) as e:
             self.db.rollback()
             print(f"Error getting user: {str(e)}")
             raise HTTPException(
                 status_code=500, detail="Error getting user")
         
+    def get_user_stats(self, user_id: int) -> schemas.UserStats:
+        """
+        Retrieve a user's profile counters in one aggregate query, cached for USER_STATS_CACHE_SECONDS.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            schemas.UserStats: Follower, following, blog, likes-received and comment counts.
+
+        Raises:
+            HTTPException: If the user does not exist or an error occurs.
+        """
+        try:
+            stats = user_stats_cache.get(user_id)
+            if stats is not None:
+                return stats
+
+            published_blogs = (Blog.author_id == user_id, Blog.published == True)
+            row = (
+                self.db.query(
+                    User.id,
+                    select(func.count(Follow.id)).where(Follow.followed_id == user_id).scalar_subquery().label("followers"),
+                    select(func.count(Follow.id)).where(Follow.follower_id == user_id).scalar_subquery().label("following"),
+                    select(func.count(Blog.id)).where(*published_blogs).scalar_subquery().label("blogs"),
+                    select(func.count(BlogLike.id)).join(Blog, Blog.id == BlogLike.blog_id).where(*published_blogs).scalar_subquery().label("likes_received"),
+                    select(func.count(Comment.id)).where(Comment.author_id == user_id).scalar_subquery().label("comments"),
+                )
+                .filter(User.id == user_id, User.deleted_at.is_(None))
+                .first()
+            )
+            if not row:
+                raise HTTPException(status_code=404, detail=f"User with id {user_id} not found")
+
+            stats = schemas.UserStats(
+                user_id=row.id,
+                followers=row.followers,
+                following=row.following,
+                blogs=row.blogs,
+                likes_received=row.likes_received,
+                comments=row.comments,
+            )
+            user_stats_cache.set(user_id, stats)
+            return stats
+        except HTTPException:
+            raise
+        except (SQLAlchemyError, Exception) as e:
+            self.db.rollback()
+            logger.error("Error getting user stats: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error getting user stats")
+
     def update_user(self, request: schemas.UserUpdate):
         """
         Update the current user's information.
@@ -83,6 +187,8 @@ class UserService(BaseService):
                 setattr(user, key, value) 
                 
             self.db.commit()
+            if "username" in update_data:
+                username_index.rename(user.id, user.username)
             return {"detail": f"User with id({self.current_user.id}) has been updated"}
         except (SQLAlchemyError, Exception) as e:
             self.db.rollback()
@@ -94,6 +200,9 @@ class UserService(BaseService):
         """
         Delete the current user's account.
 
+        The account is soft-deleted at once (it can no longer log in or be listed) and its
+        blogs, comments, likes and follows are purged in batches by the background AccountPurger.
+
         Returns:
             dict: A success message indicating the user has been deleted.
 
@@ -101,14 +210,91 @@ class UserService(BaseService):
             HTTPException: If the user does not exist or an error occurs.
         """
         try:
-            user = self.db.query(User).filter(User.id == self.current_user.id).first()
+            user = self.db.query(User).filter(User.id == self.current_user.id, User.deleted_at.is_(None)).first()
             if not user:
                 raise HTTPException(status_code=404, detail="User not found")
-            self.db.delete(user)
+            follower_ids = [row[0] for row in self.db.query(Follow.follower_id).filter(Follow.followed_id == user.id).all()]
+            user.deleted_at = datetime.now(timezone.utc)
             self.db.commit()
+
+            username_index.remove(user.id)
+            for followed_id in follow_graph.following(user.id):
+                follow_graph.remove_edge(user.id, followed_id)
+            for follower_id in follow_graph.followers(user.id):
+                follow_graph.remove_edge(follower_id, user.id)
+            user_stats_cache.invalidate(user.id)
+            # Followers' cached followee sets would otherwise report the account as followed until they expire
+            followee_cache.invalidate(user.id, *follower_ids)
+            account_purger.wake()
             return {"detail": f"User with name: {self.current_user.username} and id: {self.current_user.id} has been deleted"}
         except (SQLAlchemyError, Exception) as e:
             self.db.rollback()
             print(f"Error updating user: {str(e)}")
             raise HTTPException(
-                status_code=500, detail="Error deleting user")    
\ No newline at end of file
+                status_code=500, detail="Error deleting user")
+
+    def search_users(self, prefix: str, limit: int = settings.USER_SEARCH_LIMIT) -> List[schemas.UserSearchResult]:
+        """
+        Autocomplete usernames starting with `prefix` (case-insensitive).
+
+        Args:
+            prefix (str): The typed prefix.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[schemas.UserSearchResult]: Exact match first, then the most followed users.
+
+        Raises:
+            HTTPException: If the username index hasn't finished loading.
+        """
+        if not username_index.ready:
+            raise HTTPException(status_code=503, detail="User search is still loading, try again shortly")
+        return [
+            schemas.UserSearchResult(id=user_id, username=username, followers=followers)
+            for user_id, username, followers in username_index.search(prefix, limit)
+        ]
+
+    def get_purge_status(self) -> List[schemas.AccountPurgeStatus]:
+        """
+        Report deleted accounts still being purged, plus the purges this worker has run.
+
+        Returns:
+            List[schemas.AccountPurgeStatus]: One entry per account.
+
+        Raises:
+            HTTPException: If the current user is not an admin or an error occurs.
+        """
+        if self.current_user.role != 'admin':
+            raise HTTPException(status_code=403, detail="Only admins can view account purges")
+        try:
+            pending = [row[0] for row in self.db.query(User.id).filter(User.deleted_at.isnot(None)).order_by(User.deleted_at).all()]
+            statuses = {user_id: dict(progress) for user_id, progress in account_purger.progress.items()}
+            for user_id in pending:
+                statuses.setdefault(user_id, {"user_id": user_id, "status": "pending"})
+            return [schemas.AccountPurgeStatus(**status) for status in statuses.values()]
+        except (SQLAlchemyError, Exception) as e:
+            self.db.rollback()
+            logger.error("Error getting purge status: %s", e)
+            raise HTTPException(
+                status_code=500, detail="Error getting purge status")
+
+
+def load_username_rows() -> Iterator[UserRow]:
+    """Stream (id, username, follower count) for every user into the username index."""
+    db = SessionLocal()
+    try:
+        follower_counts = (
+            select(Follow.followed_id, func.count().label("followers"))
+            .group_by(Follow.followed_id)
+            .subquery()
+        )
+        rows = (
+            db.query(User.id, User.username, func.coalesce(follower_counts.c.followers, 0))
+            .outerjoin(follower_counts, follower_counts.c.followed_id == User.id)
+            .filter(User.deleted_at.is_(None))
+            .yield_per(10000)
+        )
+        for user_id, username, followers in rows:
+            yield user_id, username, followers
+    finally:
+        db.close()
@@ -0,0 +1,157 @@
+import heapq
+import logging
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+UserRow = Tuple[int, str, int]  # (user_id, username, follower count)
+
+
+def normalize_username(username: str) -> str:
+    return unicodedata.normalize("NFKC", username).casefold().strip()
+
+
+class UsernameIndex:
+    """
+    Sorted array of normalized usernames answering prefix lookups with two bisects.
+
+    Matches are ranked exact match first, then by follower count, then shorter names.
+    The ranked top `max_limit` per prefix is memoized, and only the prefixes of a
+    changed username are evicted, so hot lookups are a dict hit. Follower counts are
+    refreshed with the periodic rebuild, not on every follow.
+    """
+
+    def __init__(self, max_limit: int = settings.USER_SEARCH_MAX_LIMIT, cache_size: int = 50000):
+        self.max_limit = max_limit
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        self._keys: List[str] = []
+        self._ids = array('i')
+        self._users: Dict[int, Tuple[str, int]] = {}
+        self._results: "OrderedDict[str, List[UserRow]]" = OrderedDict()
+        self._journal: Optional[List[Tuple[str, tuple]]] = None
+        self._thread: Optional[threading.Thread] = None
+        self.ready = False
+
+    def load(self, rows: Iterable[UserRow]):
+        """Replace the index with `rows`, keeping changes that raced the load."""
+        with self._lock:
+            self._journal = []
+        users = {user_id: (username, followers) for user_id, username, followers in rows}
+        entries = sorted((normalize_username(username), user_id) for user_id, (username, _) in users.items())
+        keys = [key for key, _ in entries]
+        ids = array('i', (user_id for _, user_id in entries))
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._keys, self._ids, self._users = keys, ids, users
+            self._results.clear()
+            for operation, args in journal:
+                getattr(self, operation)(*args)
+            self.ready = True
+
+    def _record(self, operation: str, *args):
+        if self._journal is not None:
+            self._journal.append((operation, args))
+
+    def _evict_prefixes(self, key: str):
+        for end in range(1, len(key) + 1):
+            self._results.pop(key[:end], None)
+
+    def _insert(self, user_id: int, username: str):
+        key = normalize_username(username)
+        position = bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._ids.insert(position, user_id)
+        self._evict_prefixes(key)
+
+    def _delete(self, user_id: int, username: str):
+        key = normalize_username(username)
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key:
+            if self._ids[position] == user_id:
+                del self._keys[position]
+                del self._ids[position]
+                break
+            position += 1
+        self._evict_prefixes(key)
+
+    def add(self, user_id: int, username: str, followers: int = 0):
+        with self._lock:
+            self._record("add", user_id, username, followers)
+            if user_id in self._users:
+                self._delete(user_id, self._users[user_id][0])
+            self._users[user_id] = (username, followers)
+            self._insert(user_id, username)
+
+    def remove(self, user_id: int):
+        with self._lock:
+            self._record("remove", user_id)
+            user = self._users.pop(user_id, None)
+            if user is not None:
+                self._delete(user_id, user[0])
+
+    def rename(self, user_id: int, username: str):
+        with self._lock:
+            followers = self._users.get(user_id, (None, 0))[1]
+            self.add(user_id, username, followers)
+
+    def search(self, prefix: str, limit: int = settings.USER_SEARCH_LIMIT) -> List[UserRow]:
+        """
+        Rank the users whose normalized username starts with `prefix`.
+
+        Returns:
+            List[UserRow]: Up to `limit` (user_id, username, followers), best first.
+        """
+        key = normalize_username(prefix)
+        if not key:
+            return []
+        with self._lock:
+            ranked = self._results.get(key)
+            if ranked is not None:
+                self._results.move_to_end(key)
+                return ranked[:limit]
+            low = bisect_left(self._keys, key)
+            high = bisect_left(self._keys, key + "\U0010ffff", low)
+            keys, ids, users = self._keys, self._ids, self._users
+            best = heapq.nlargest(
+                self.max_limit,
+                range(low, high),
+                key=lambda position: (keys[position] == key, users[ids[position]][1], -len(keys[position])),
+            )
+            ranked = [(ids[position], *users[ids[position]]) for position in best]
+            self._results[key] = ranked
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return ranked[:limit]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def start(self, load_rows: Callable[[], Iterable[UserRow]], refresh_seconds: float = settings.USER_SEARCH_REFRESH_SECONDS):
+        """Load in a daemon thread and rebuild every `refresh_seconds`; the app serves meanwhile."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                started = time.perf_counter()
+                try:
+                    self.load(load_rows())
+                    logger.info("Username index loaded: %s users in %.2fs", len(self), time.perf_counter() - started)
+                except Exception as e:
+                    logger.error("Error loading username index: %s", e)
+                time.sleep(refresh_seconds)
+
+        self._thread = threading.Thread(target=run, name="username-index", daemon=True)
+        self._thread.start()
+
+
+username_index = UsernameIndex()
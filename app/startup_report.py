@@ -0,0 +1,117 @@
+"""
+Report where a worker's cold start goes: import time per module and time to first response.
+
+    python -m app.startup_report [--top 15] [--budget-ms 2000]
+
+Starts a fresh interpreter with `-X importtime`, imports app.main, runs the startup
+handlers and sends one request through the full middleware stack, as a new worker
+does when it joins a scaled-out deployment. It then prints the slowest packages and
+app modules, the import total and the time from spawning the process to the first
+response. With --budget-ms it exits with status 1 if that time is over budget.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+PROBE_PATH = "/metrics"  # goes through every middleware but needs no database or token
+
+
+def _first_response() -> Dict[str, float]:
+    """Runs in the measured interpreter."""
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def serve():
+        await app.router.startup()
+        status = None
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": PROBE_PATH, "raw_path": PROBE_PATH.encode(), "root_path": "", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 8000),
+        }
+        await app(scope, receive, send)
+        responded = time.perf_counter()
+        await app.router.shutdown()
+        return status, responded
+
+    status, responded = asyncio.run(serve())
+    return {
+        "status": status,
+        "import_ms": (imported - started) * 1000,
+        "startup_and_request_ms": (responded - imported) * 1000,
+        "responded_at": time.time() - (time.perf_counter() - responded),
+    }
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for each `-X importtime` line."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=15, help="rows per table")
+    parser.add_argument("--budget-ms", type=float, help="exit with status 1 if the first response takes longer")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_first_response()))
+        return
+
+    spawned = time.time()
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "app.startup_report", "--child"],
+        capture_output=True, text=True, env=os.environ,
+    )
+    if child.returncode != 0:
+        sys.stderr.write(child.stderr[-4000:])
+        sys.exit(child.returncode)
+    result = json.loads(child.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(child.stderr)
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    print(f"{'package (self time)':<40}{'ms':>9}")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<40}{self_us / 1000:>9.1f}")
+
+    print(f"\n{'app module (self / cumulative)':<40}{'ms':>9}{'ms':>9}")
+    app_modules = [module for module in modules if module[0] == "app" or module[0].startswith("app.")]
+    for name, self_us, cumulative_us in sorted(app_modules, key=lambda module: -module[1])[:args.top]:
+        print(f"{name:<40}{self_us / 1000:>9.1f}{cumulative_us / 1000:>9.1f}")
+
+    first_response_ms = (result["responded_at"] - spawned) * 1000
+    print(f"\nimport app.main            {result['import_ms']:>8.0f} ms")
+    print(f"startup + first request    {result['startup_and_request_ms']:>8.0f} ms (GET {PROBE_PATH} -> {result['status']})")
+    print(f"spawn to first response    {first_response_ms:>8.0f} ms (includes -X importtime overhead)")
+    if args.budget_ms is not None and first_response_ms > args.budget_ms:
+        print(f"over budget of {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.staticfiles import StaticFiles
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+# Content-Encoding -> suffix of the precompressed copy, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+# Already-compressed formats aren't worth a precompressed copy
+_SKIP_COMPRESSION = {".jpeg", ".jpg", ".png", ".gif", ".webp", ".woff", ".woff2", ".zip", ".gz", ".br"}
+
+
+def hashed_name(name: str, digest: str) -> str:
+    # css/site.css -> css/site.3f2a9c1b04d7.css
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{digest[:12]}{extension}"
+
+
+def _compress(path: str, data: bytes):
+    # Keep a copy only when it saves at least a tenth of the size
+    copies = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli  # build-time only
+        copies[".br"] = brotli.compress(data, quality=11)
+    except ImportError:
+        logger.warning("brotli is not installed, skipping .br copies")
+    for suffix, compressed in copies.items():
+        if len(compressed) < len(data) * 0.9:
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+
+
+def build(source: str = settings.STATIC_DIR, target: str = settings.STATIC_BUILD_DIR) -> Dict[str, str]:
+    """
+    Copy every file under `source` to `target` under a content-hashed name, with
+    .gz/.br copies, and write the manifest mapping logical names to hashed ones.
+
+    Files from earlier builds are left in place so pages cached before a deploy still
+    find their assets.
+
+    Returns:
+        Dict[str, str]: The manifest.
+    """
+    manifest = {}
+    for directory, _, files in os.walk(source):
+        for file in files:
+            path = os.path.join(directory, file)
+            name = os.path.relpath(path, source).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                data = f.read()
+            hashed = hashed_name(name, hashlib.sha256(data).hexdigest())
+            output = os.path.join(target, hashed)
+            if not os.path.exists(output):
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                shutil.copyfile(path, output)
+                if os.path.splitext(name)[1].lower() not in _SKIP_COMPRESSION:
+                    _compress(output, data)
+            manifest[name] = hashed
+
+    staged = os.path.join(target, MANIFEST + ".tmp")
+    with open(staged, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(staged, os.path.join(target, MANIFEST))
+    return manifest
+
+
+def load_manifest(directory: str = settings.STATIC_BUILD_DIR) -> Dict[str, str]:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class AssetStaticFiles(StaticFiles):
+    """
+    Serves the build made by `python -m app.static_assets`, falling back to the plain
+    source directory when there is none.
+
+    Hashed names never change content, so they are cached for a year as immutable.
+    Logical names keep working but are served with `no-cache`, making clients revalidate
+    with the ETag. Precompressed copies are sent to clients that accept them.
+    """
+
+    def __init__(self, directory: str = settings.STATIC_DIR, build_directory: str = settings.STATIC_BUILD_DIR):
+        self.manifest = load_manifest(build_directory)
+        self.hashed = set(self.manifest.values())
+        self.built_files = set()
+        if self.manifest:
+            directory = build_directory
+            for folder, _, files in os.walk(build_directory):
+                self.built_files.update(os.path.relpath(os.path.join(folder, file), build_directory).replace(os.sep, "/") for file in files)
+        else:
+            logger.warning("No static asset build in %s, serving %s without long-lived caching", build_directory, directory)
+        super().__init__(directory=directory)
+
+    def _pick_encoding(self, path: str, scope) -> Optional[str]:
+        accepted = {token.split(";")[0].strip() for token in Headers(scope=scope).get("accept-encoding", "").split(",")}
+        for encoding, suffix in ENCODINGS.items():
+            if encoding in accepted and path + suffix in self.built_files:
+                return encoding
+        return None
+
+    async def get_response(self, path: str, scope):
+        path = path.replace(os.sep, "/")
+        immutable = path in self.hashed
+        path = self.manifest.get(path, path)
+        variants = any(path + suffix in self.built_files for suffix in ENCODINGS.values())
+        encoding = self._pick_encoding(path, scope) if variants else None
+
+        # The content type follows the original name: mimetypes reads "x.css.br" as text/css
+        response = await super().get_response(path + ENCODINGS[encoding] if encoding else path, scope)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable" if immutable else "no-cache"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if variants:
+            response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    built = build()
+    print(f"Built {len(built)} static assets into {settings.STATIC_BUILD_DIR}")
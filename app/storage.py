@@ -0,0 +1,205 @@
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+
+
+class StorageBackend(ABC):
+    """Where uploaded media lives. Calls block and are made from the upload worker pool."""
+
+    @abstractmethod
+    def upload(self, path: str, content_type: Optional[str] = None) -> str:
+        """Store the file at `path` and return its public URL."""
+
+    @abstractmethod
+    def delete(self, url: str):
+        """Remove a previously uploaded file; unknown URLs are ignored."""
+
+    def local_path(self, name: str) -> Optional[str]:
+        """Filesystem path of a stored file this app serves itself, or None."""
+        return None
+
+    @abstractmethod
+    def list_files(self) -> Iterator[Tuple[str, datetime]]:
+        """Yield (url, last stored at) for every file this app uploaded."""
+
+    def key(self, url: str) -> str:
+        """Identity of a stored file, used to compare URLs the backend may format differently."""
+        return url
+
+    def delete_many(self, urls: List[str]):
+        for url in urls:
+            self.delete(url)
+
+
+def cloudinary_public_id(url: str) -> str:
+    # .../image/upload/[transformations/]v1712345678/folder/name.jpg -> folder/name
+    path = url.split("/upload/", 1)[-1]
+    segments = path.split("/")
+    for index, segment in enumerate(segments):
+        if re.fullmatch(r"v\d+", segment):
+            segments = segments[index + 1:]
+            break
+    return os.path.splitext("/".join(segments))[0]
+
+
+class CloudinaryStorage(StorageBackend):
+    """Uploads are tagged with CLOUDINARY_TAG so listing never reaches other assets in the account."""
+
+    def __init__(self):
+        # The SDK is slow to import, so only this backend loads it, on first use
+        import cloudinary
+        import cloudinary.api
+        import cloudinary.uploader
+
+        credentials = {
+            "cloud_name": settings.CLOUDINARY_CLOUD_NAME,
+            "api_key": settings.CLOUDINARY_API_KEY,
+            "api_secret": settings.CLOUDINARY_API_SECRET,
+        }
+        # Unset ones are left to the SDK, which reads CLOUDINARY_URL
+        cloudinary.config(secure=True, **{name: value for name, value in credentials.items() if value})
+        self.api = cloudinary.api
+        self.uploader = cloudinary.uploader
+
+    def upload(self, path: str, content_type: Optional[str] = None) -> str:
+        return self.uploader.upload(path, tags=[settings.CLOUDINARY_TAG])["secure_url"]
+
+    def delete(self, url: str):
+        self.uploader.destroy(cloudinary_public_id(url))
+
+    def list_files(self) -> Iterator[Tuple[str, datetime]]:
+        cursor = None
+        while True:
+            options = {"next_cursor": cursor} if cursor else {}
+            page = self.api.resources_by_tag(settings.CLOUDINARY_TAG, max_results=500, **options)
+            for resource in page["resources"]:
+                yield resource["secure_url"], datetime.fromisoformat(resource["created_at"].replace("Z", "+00:00"))
+            cursor = page.get("next_cursor")
+            if not cursor:
+                return
+
+    def key(self, url: str) -> str:
+        return cloudinary_public_id(url)
+
+    def delete_many(self, urls: List[str]):
+        public_ids = [cloudinary_public_id(url) for url in urls]
+        for start in range(0, len(public_ids), 100):  # Admin API limit per call
+            self.api.delete_resources(public_ids[start:start + 100])
+
+
+class LocalStorage(StorageBackend):
+    """
+    Content-addressed store on the local filesystem.
+
+    Files are named by the SHA-256 of their bytes, fanned out as `ab/cd/<hash><ext>`, so
+    identical uploads are stored once and a name never changes meaning (it can be cached
+    forever). They are served by GET /files/media/{name}, with range requests.
+    """
+
+    NAME = re.compile(r"[0-9a-f]{64}(\.[a-z0-9]+)?")
+
+    def __init__(self, root: str = settings.MEDIA_ROOT, base_url: str = settings.MEDIA_URL, chunk_size: int = 1024 * 1024):
+        self.root = root
+        self.base_url = base_url
+        self.chunk_size = chunk_size
+        os.makedirs(os.path.join(root, ".tmp"), exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name[:2], name[2:4], name)
+
+    def upload(self, path: str, content_type: Optional[str] = None) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as source, tempfile.NamedTemporaryFile(dir=os.path.join(self.root, ".tmp"), delete=False) as target:
+            for chunk in iter(lambda: source.read(self.chunk_size), b""):
+                digest.update(chunk)
+                target.write(chunk)
+        extension = (mimetypes.guess_extension(content_type) or "") if content_type else ""
+        name = digest.hexdigest() + extension
+        final = self._path(name)
+        if os.path.exists(final):
+            os.unlink(target.name)  # already stored
+            os.utime(final)  # restart its grace period, it may have been an orphan about to be collected
+        else:
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(target.name, final)
+        return self.base_url + name
+
+    def delete(self, url: str):
+        name = url.rsplit("/", 1)[-1]
+        if self.NAME.fullmatch(name):
+            try:
+                os.unlink(self._path(name))
+            except FileNotFoundError:
+                pass
+
+    def local_path(self, name: str) -> Optional[str]:
+        if not self.NAME.fullmatch(name):
+            return None
+        path = self._path(name)
+        return path if os.path.isfile(path) else None
+
+    def list_files(self) -> Iterator[Tuple[str, datetime]]:
+        for directory, folders, files in os.walk(self.root):
+            folders[:] = [folder for folder in folders if folder != ".tmp"]
+            for name in files:
+                if self.NAME.fullmatch(name):
+                    modified = os.stat(os.path.join(directory, name)).st_mtime
+                    yield self.base_url + name, datetime.fromtimestamp(modified, timezone.utc)
+
+    def key(self, url: str) -> str:
+        # The content hash, so files stay matched if MEDIA_URL changes
+        return url.rsplit("/", 1)[-1]
+
+
+class FakeStorage(StorageBackend):
+    """Keeps uploads in memory, for tests and local runs without Cloudinary credentials."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay  # simulate a slow upstream
+        self.objects: Dict[str, bytes] = {}
+        self.stored_at: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def upload(self, path: str, content_type: Optional[str] = None) -> str:
+        time.sleep(self.delay)
+        with open(path, "rb") as f:
+            data = f.read()
+        url = f"fake://media/{hashlib.sha256(data).hexdigest()}"
+        with self._lock:
+            self.objects[url] = data
+            self.stored_at[url] = datetime.now(timezone.utc)
+        return url
+
+    def delete(self, url: str):
+        time.sleep(self.delay)
+        with self._lock:
+            self.objects.pop(url, None)
+            self.stored_at.pop(url, None)
+
+    def list_files(self) -> Iterator[Tuple[str, datetime]]:
+        with self._lock:
+            files = list(self.stored_at.items())
+        yield from files
+
+
+_BACKENDS = {"cloudinary": CloudinaryStorage, "local": LocalStorage, "fake": FakeStorage}
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """The backend named by STORAGE_BACKEND, created on first use."""
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND not in _BACKENDS:
+            raise ValueError(f"Unknown STORAGE_BACKEND {settings.STORAGE_BACKEND!r}, expected one of {', '.join(_BACKENDS)}")
+        _storage = _BACKENDS[settings.STORAGE_BACKEND]()
+    return _storage
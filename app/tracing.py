@@ -0,0 +1,245 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from app.config import settings
+from app.db.database import engine
+from app.metrics import current_route
+from app.profiling import profiled_thread
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+
+class Trace:
+    """The spans recorded for one sampled request."""
+
+    def __init__(self, trace_id: Optional[str] = None, parent_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.parent_id = parent_id  # span of the caller, from traceparent
+        self.spans: List[Span] = []  # appended from the event loop and threadpool alike
+        self._wall_ns = time.time_ns()
+        self._perf = time.perf_counter()
+
+    def unix_nanos(self, perf: float) -> int:
+        return self._wall_ns + int((perf - self._perf) * 1e9)
+
+    def server_timing(self) -> str:
+        """Finished spans summed by name, as a Server-Timing header value."""
+        totals: Dict[str, List[float]] = {}
+        for span in self.spans[1:]:  # the first is the request itself
+            if span.end is not None:
+                totals.setdefault(span.name, []).append(span.duration_ms)
+        parts = []
+        for name, durations in totals.items():
+            desc = f';desc="{len(durations)}x"' if len(durations) > 1 else ""
+            parts.append(f"{name}{desc};dur={sum(durations):.2f}")
+        root = self.spans[0]
+        parts.append(f"total;dur={root.duration_ms:.2f}")
+        return ", ".join(parts)
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+def start_span(name: str, **attributes) -> Optional[Span]:
+    """Open a span under the current one; None (and no cost beyond a lookup) when the request isn't sampled."""
+    trace = _trace.get()
+    if trace is None:
+        return None
+    parent = _span.get()
+    span = Span(name, parent.span_id if parent else trace.parent_id, attributes)
+    trace.spans.append(span)
+    return span
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record the enclosed block as a span of the current request's trace."""
+    opened = start_span(name, **attributes)
+    if opened is None:
+        yield None
+        return
+    token = _span.set(opened)
+    try:
+        yield opened
+    finally:
+        opened.end = time.perf_counter()
+        _span.reset(token)
+
+
+class TracedRoute(APIRoute):
+    """Records the endpoint function of each route as a `service` span, and samples it when profiling."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if getattr(endpoint, "_traced", False):  # include_router builds the route again from its endpoint
+            super().__init__(path, endpoint, **kwargs)
+            return
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def traced(*args, **kw):
+                with span("service", function=endpoint.__name__), profiled_thread():
+                    return await endpoint(*args, **kw)
+        else:
+            @functools.wraps(endpoint)
+            def traced(*args, **kw):
+                with span("service", function=endpoint.__name__), profiled_thread():
+                    return endpoint(*args, **kw)
+        traced._traced = True
+        super().__init__(path, traced, **kwargs)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    context._trace_span = start_span("db", statement=statement[:200])
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    if context._trace_span is not None:
+        context._trace_span.end = time.perf_counter()
+
+
+class FileExporter:
+    """
+    Appends finished traces to a file as OTLP/JSON, one ExportTraceServiceRequest per
+    line, the format of the OpenTelemetry collector's file exporter and receiver.
+    Writes happen on a background thread; traces are dropped if it falls behind.
+    """
+
+    def __init__(self, path: str, max_pending: int = 1000):
+        self.path = path
+        self._queue: "queue.Queue[Trace]" = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            pass
+
+    @staticmethod
+    def _attributes(attributes: Dict) -> List[Dict]:
+        values = []
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                values.append({"key": key, "value": {"boolValue": value}})
+            elif isinstance(value, int):
+                values.append({"key": key, "value": {"intValue": str(value)}})
+            else:
+                values.append({"key": key, "value": {"stringValue": str(value)}})
+        return values
+
+    def encode(self, trace: Trace) -> str:
+        spans = [
+            {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 2 if span is trace.spans[0] else 1,  # SERVER for the request, INTERNAL otherwise
+                "startTimeUnixNano": str(trace.unix_nanos(span.start)),
+                "endTimeUnixNano": str(trace.unix_nanos(span.end or span.start)),
+                "attributes": self._attributes(span.attributes),
+            }
+            for span in trace.spans
+        ]
+        return json.dumps({"resourceSpans": [{
+            "resource": {"attributes": self._attributes({"service.name": settings.TRACE_SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]})
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                with open(self.path, "a") as f:
+                    f.write(self.encode(trace) + "\n")
+            except Exception as e:
+                logger.error("Error exporting trace %s: %s", trace.trace_id, e)
+
+
+class TracingMiddleware:
+    """
+    Traces a sample of requests: TRACE_SAMPLE_RATE of them, plus those whose W3C
+    `traceparent` header is flagged sampled. Sampled responses carry a Server-Timing
+    header summing their spans by name. Time between the endpoint returning and the
+    response starting is recorded as `serialize`.
+    """
+
+    def __init__(self, app, sample_rate: float = settings.TRACE_SAMPLE_RATE, export_path: Optional[str] = settings.TRACE_EXPORT_PATH):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.exporter = FileExporter(export_path) if export_path else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        parent = _TRACEPARENT.fullmatch(dict(scope["headers"]).get(b"traceparent", b"").decode("latin-1"))
+        if parent and int(parent.group(3), 16) & 1:
+            trace = Trace(parent.group(1), parent.group(2))
+        elif random.random() < self.sample_rate:
+            trace = Trace()
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        trace_token = _trace.set(trace)
+        # current_route is set by MetricsMiddleware, which wraps this one
+        root = start_span("request", **{"http.method": scope["method"], "http.route": current_route.get(), "http.target": scope["path"]})
+        span_token = _span.set(root)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                services = [span for span in trace.spans if span.name == "service" and span.end is not None]
+                if services:
+                    serialize = Span("serialize", root.span_id, {})
+                    serialize.start = services[-1].end
+                    serialize.end = time.perf_counter()
+                    trace.spans.append(serialize)
+                root.attributes["http.status_code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", trace.server_timing().encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            root.end = time.perf_counter()
+            _span.reset(span_token)
+            _trace.reset(trace_token)
+            if self.exporter is not None:
+                self.exporter.export(trace)
@@ -1,9 +1,12 @@
-from app.db.models import User
 from sqlalchemy.orm import Session
 from sqlalchemy.sql.elements import BinaryExpression
 from app.db import models
-from fastapi import UploadFile
-import cloudinary.uploader
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import List, Optional, Set, Type
+from app.config import settings
 
 # Custom functions to reuse filter (Makes my life a little bit easier)
 
@@ -14,40 +17,31 @@ def filter_blog(db: Session, filter_condition: BinaryExpression):
 def filter_user(db: Session, filter_condition: BinaryExpression):
     return db.query(models.User).filter(filter_condition)
 
-def upload_profile_picture(user: User, file: UploadFile, db: Session):
+def parse_id_list(raw_ids: str, limit: Optional[int] = None) -> List[int]:
+    # Parses "?ids=1,2,3" into [1, 2, 3], keeping request order (duplicates included)
+    limit = limit or settings.BATCH_MAX_IDS
     try:
-        if user.profile_url:
-            public_id = user.profile_url.split("/")[-1].split(".")[0]
-            cloudinary.uploader.destroy(public_id)
-
-
-        upload_response = cloudinary.uploader.upload(file.file)
-        img_url = upload_response["secure_url"]
-
-        user.profile_url = img_url
-        db.commit()
-        db.refresh(user)
-
-        return {"image_url": img_url}
-    
-    except Exception as e:
-        return {"error": str(e)}
-    
-def upload_cover_photo(user: User, file: UploadFile, db: Session):
-    try:
-        if user.cover_photo_url:
-            public_id = user.cover_photo_url.split("/")[-1].split(".")[0]
-            cloudinary.uploader.destroy(public_id)
-
-
-        upload_response = cloudinary.uploader.upload(file.file)
-        img_url = upload_response["secure_url"]
-
-        user.cover_photo_url = img_url
-        db.commit()
-        db.refresh(user)
-
-        return {"image_url": img_url}
-    
-    except Exception as e:
-        return {"error": str(e)}
+        ids = [int(part) for part in raw_ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="At least one id is required")
+    if len(ids) > limit:
+        raise HTTPException(status_code=400, detail=f"Too many ids requested (max {limit})")
+    return ids
+
+def parse_fields(raw_fields: Optional[str], schema: Type[BaseModel]) -> Optional[Set[str]]:
+    # Parses "?fields=id,title" against the response schema; None means "every field"
+    if not raw_fields:
+        return None
+    fields = {part.strip() for part in raw_fields.split(",") if part.strip()}
+    unknown = fields - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(sorted(unknown))}. Allowed: {', '.join(schema.model_fields)}")
+    return fields or None
+
+def sparse_response(result, fields: Optional[Set[str]]):
+    # Sparse payloads don't satisfy the route's response model, so they skip its validation
+    if fields is None:
+        return result
+    return JSONResponse(content=jsonable_encoder(result))
@@ -0,0 +1,107 @@
+"""
+Benchmark the in-memory follow graph on a synthetic social graph.
+
+    python -m benchmarks.follow_graph --users 100000 --edges 1000000
+
+Followees are drawn with a Zipf-like skew so a few accounts have very large follower
+counts, which is the case the self-join queries this replaces handle worst. Before
+timing anything it checks that writes racing a rebuild are not lost or resurrected.
+"""
+import argparse
+import random
+import statistics
+import time
+from array import array
+
+from app.services.follow_graph import FollowGraph, edges_from_pairs
+
+
+def synthetic_edges(users: int, edges: int, skew: float, seed: int):
+    rng = random.Random(seed)
+    weights = [1 / (rank ** skew) for rank in range(1, users + 1)]
+    popular = list(range(1, users + 1))
+    rng.shuffle(popular)
+    seen = set()
+    sources, targets = array('i'), array('i')
+    while len(sources) < edges:
+        followers = [rng.randint(1, users) for _ in range(edges - len(sources))]
+        followed = rng.choices(popular, weights=weights, k=len(followers))
+        for follower_id, followed_id in zip(followers, followed):
+            if follower_id != followed_id and (follower_id, followed_id) not in seen:
+                seen.add((follower_id, followed_id))
+                sources.append(follower_id)
+                targets.append(followed_id)
+    return sources, targets
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    return f"p50={pick(0.50):.2f}ms p95={pick(0.95):.2f}ms p99={pick(0.99):.2f}ms mean={statistics.mean(samples) * 1000:.2f}ms"
+
+
+def timed(func, args_list):
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def check_overlay():
+    """Writes that race a rebuild are replayed onto a base that may already include them."""
+    graph = FollowGraph()
+    graph.load(lambda: edges_from_pairs([(1, 2)]))
+
+    def reload_during(write, pairs):
+        def load_edges():
+            write()  # journaled, and already reflected in the rows read
+            return edges_from_pairs(pairs)
+        graph.load(load_edges)
+
+    # follow -> rebuild -> unfollow
+    reload_during(lambda: graph.add_edge(1, 3), [(1, 2), (1, 3)])
+    graph.remove_edge(1, 3)
+    assert graph.following(1) == [2] and graph.followers(3) == [], graph.following(1)
+
+    # unfollow -> rebuild -> follow
+    reload_during(lambda: graph.remove_edge(1, 2), [])
+    graph.add_edge(1, 2)
+    assert graph.following(1) == [2] and graph.followers(2) == [1], graph.following(1)
+    print("overlay replay check passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--edges", type=int, default=1_000_000)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    check_overlay()
+    started = time.perf_counter()
+    sources, targets = synthetic_edges(args.users, args.edges, args.skew, args.seed)
+    print(f"generated {len(sources)} edges over {args.users} users in {time.perf_counter() - started:.2f}s")
+
+    graph = FollowGraph()
+    started = time.perf_counter()
+    graph.load(lambda: (sources, targets))
+    print(f"built CSR in {time.perf_counter() - started:.2f}s, {graph.nbytes / 2 ** 20:.1f} MiB of buffers")
+
+    rng = random.Random(args.seed + 1)
+    sample = [rng.randint(1, args.users) for _ in range(args.queries)]
+    pairs = [(user_id, rng.randint(1, args.users)) for user_id in sample]
+
+    print("suggestions     ", percentiles(timed(graph.suggestions, [(user_id, 20) for user_id in sample])))
+    print("mutual_followers", percentiles(timed(graph.mutual_followers, pairs)))
+
+    writes = timed(graph.add_edge, pairs) + timed(graph.remove_edge, pairs)
+    print("follow/unfollow ", percentiles(writes))
+    print("suggestions (with pending writes)", percentiles(timed(graph.suggestions, [(user_id, 20) for user_id in sample])))
+
+
+if __name__ == "__main__":
+    main()
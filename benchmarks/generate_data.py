@@ -0,0 +1,157 @@
+"""
+Fill a database with a synthetic, realistically skewed blog dataset.
+
+    python -m benchmarks.generate_data --database-url sqlite:///bench.db --create-tables --users 10000
+
+Authorship, blog popularity and follower counts follow Zipf distributions: a few
+prolific authors, a few viral posts collecting most likes and comments, and a few
+accounts followed by everyone. Rows are bulk-inserted with explicit ids after the
+current maximum, so the script can also top up an existing database. Every user is
+named `bench<id>` and shares the password given with --password, which is what
+benchmarks.load_test logs in with.
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, func, insert, select
+
+from app.auth.auth_utils import hash_password
+from app.config import settings
+from app.db.database import Base
+from app.db.models import User, Blog, BlogLike, Comment, CommentLike, Follow
+from app.services.comment_service import path_segment
+from benchmarks.zipf import Zipf
+
+TAGS = ["entertainment", "technology", "health & wellness", "lifestyle"]  # the tags BlogCreate accepts
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore "
+         "magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo").split()
+
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def bulk_insert(engine, model, rows: List[Dict], batch_size: int):
+    started = time.perf_counter()
+    for start in range(0, len(rows), batch_size):
+        with engine.begin() as conn:
+            conn.execute(insert(model), rows[start:start + batch_size])
+    print(f"{model.__tablename__}: {len(rows)} rows in {time.perf_counter() - started:.1f}s")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--create-tables", action="store_true", help="create missing tables first (for scratch databases)")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--blogs", type=int, default=20_000)
+    parser.add_argument("--comments", type=int, default=100_000)
+    parser.add_argument("--likes", type=int, default=300_000)
+    parser.add_argument("--comment-likes", type=int, default=100_000)
+    parser.add_argument("--follows", type=int, default=200_000)
+    parser.add_argument("--reply-ratio", type=float, default=0.4, help="share of comments that reply to another comment")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for authors, posts and followed accounts")
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def generate(engine, args: argparse.Namespace) -> Tuple[range, range]:
+    """Insert the dataset described by `args` and return the new user and blog id ranges."""
+    if args.create_tables:
+        Base.metadata.create_all(engine)
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    with engine.connect() as conn:
+        first = {model: next_id(conn, model) for model in (User, Blog, Comment, BlogLike, CommentLike, Follow)}
+
+    user_ids = range(first[User], first[User] + args.users)
+    blog_ids = range(first[Blog], first[Blog] + args.blogs)
+    authors = Zipf(user_ids, args.skew, rng)
+    blog_authors = authors.sample(args.blogs)
+    author_set = set(blog_authors)
+    password = hash_password(args.password)  # bcrypt once, not per user
+    bulk_insert(engine, User, [
+        {"id": user_id, "username": f"bench{user_id}", "email": f"bench{user_id}@example.com", "password": password,
+         "role": "author" if user_id in author_set else "reader", "job_description": "benchmark user",
+         "created_at": now - timedelta(days=rng.randint(0, 1000))}
+        for user_id in user_ids
+    ], args.batch_size)
+
+    blog_rows = []
+    for blog_id, author_id in zip(blog_ids, blog_authors):
+        created = now - timedelta(minutes=rng.randint(0, 500_000))
+        published = rng.random() < 0.9
+        blog_rows.append({
+            "id": blog_id, "author_id": author_id, "title": text(rng, rng.randint(3, 10)).capitalize(),
+            "content": text(rng, rng.randint(50, 600)), "tag": rng.choice(TAGS), "created_at": created,
+            "published": published, "published_at": created if published else None,
+        })
+    bulk_insert(engine, Blog, blog_rows, args.batch_size)
+
+    # Viral posts: comments and likes pile onto the same few blogs
+    popular_blogs = Zipf(blog_ids, args.skew, rng)
+    comment_rows, by_blog = [], {}
+    for comment_id, blog_id in zip(itertools.count(first[Comment]), popular_blogs.sample(args.comments)):
+        siblings = by_blog.setdefault(blog_id, [])
+        parent = rng.choice(siblings) if siblings and rng.random() < args.reply_ratio else None
+        comment_rows.append({
+            "id": comment_id, "blog_id": blog_id, "author_id": rng.choice(user_ids), "content": text(rng, rng.randint(5, 60)),
+            "parent_id": parent["id"] if parent else None, "depth": parent["depth"] + 1 if parent else 0,
+            "path": (parent["path"] if parent else "") + path_segment(comment_id), "like_count": 0,
+            "created_at": now - timedelta(minutes=rng.randint(0, 500_000)),
+        })
+        siblings.append(comment_rows[-1])
+    comment_likes = set()
+    if comment_rows:
+        popular_comments = Zipf(range(len(comment_rows)), args.skew, rng)
+        for index in popular_comments.sample(args.comment_likes):
+            pair = (comment_rows[index]["id"], rng.choice(user_ids))
+            if pair not in comment_likes:
+                comment_likes.add(pair)
+                comment_rows[index]["like_count"] += 1  # the denormalized counter, as like_comment keeps it
+    bulk_insert(engine, Comment, comment_rows, args.batch_size)
+    bulk_insert(engine, CommentLike, [
+        {"id": like_id, "comment_id": comment_id, "user_id": user_id}
+        for like_id, (comment_id, user_id) in zip(itertools.count(first[CommentLike]), comment_likes)
+    ], args.batch_size)
+
+    likes = set(zip(popular_blogs.sample(args.likes), (rng.choice(user_ids) for _ in range(args.likes))))
+    bulk_insert(engine, BlogLike, [
+        {"id": like_id, "blog_id": blog_id, "user_id": user_id}
+        for like_id, (blog_id, user_id) in zip(itertools.count(first[BlogLike]), likes)
+    ], args.batch_size)
+
+    # Celebrities: followed accounts are skewed, followers are not. Pairs are unique
+    # and the users are new, so they can't collide with existing follows.
+    followed = Zipf(user_ids, args.skew, rng)
+    follows = {
+        (follower, followed_id)
+        for follower, followed_id in zip((rng.choice(user_ids) for _ in range(args.follows)), followed.sample(args.follows))
+        if follower != followed_id
+    }
+    bulk_insert(engine, Follow, [
+        {"id": follow_id, "follower_id": follower, "followed_id": followed_id}
+        for follow_id, (follower, followed_id) in zip(itertools.count(first[Follow]), follows)
+    ], args.batch_size)
+
+    return user_ids, blog_ids
+
+
+def main():
+    args = parse_args()
+    user_ids, blog_ids = generate(create_engine(args.database_url), args)
+    print(f"users {user_ids.start}-{user_ids.stop - 1}, blogs {blog_ids.start}-{blog_ids.stop - 1}, password {args.password!r}")
+
+
+if __name__ == "__main__":
+    main()
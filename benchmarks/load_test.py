@@ -0,0 +1,180 @@
+"""
+Drive a running server with a weighted mix of requests and report latency percentiles.
+
+    python -m benchmarks.load_test --base-url http://localhost:8000 --duration 60 --concurrency 32
+
+Meant for a database filled by benchmarks.generate_data: virtual users log in as
+random `bench<id>` accounts, then loop over the scenarios in --mix, picking blogs with
+the same Zipf skew as the generated likes. Prints throughput and p50/p95/p99 per
+scenario. With --max-p95-ms the exit status is 1 when any scenario is slower, so a
+deploy pipeline can fail on a regression.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.zipf import Zipf
+
+DEFAULT_MIX = "blog_list=20,blog_get=25,comments=20,comment_create=5,follow_status=10,follow_toggle=10,user_stats=5,login=5"
+
+
+class Context:
+    def __init__(self, args, rng: random.Random):
+        self.args = args
+        self.rng = rng
+        self.user_ids = range(args.first_user, args.first_user + args.users)
+        self.blog_ids = range(args.first_blog, args.first_blog + args.blogs)
+        self.blogs = Zipf(self.blog_ids, args.skew, rng)
+        self.people = Zipf(self.user_ids, args.skew, rng)
+
+    def random_user(self) -> int:
+        return self.rng.choice(self.user_ids)
+
+
+async def login(client: httpx.AsyncClient, ctx: Context, user_id: int) -> httpx.Response:
+    return await client.post("/auth/login", json={"identifier": f"bench{user_id}", "password": ctx.args.password})
+
+
+# Each scenario sends one request as the virtual user holding `headers`
+async def scenario_login(client, ctx, headers):
+    return await login(client, ctx, ctx.random_user())
+
+
+async def scenario_blog_list(client, ctx, headers):
+    return await client.get("/blog/", params={"user_id": ctx.people.sample()[0]}, headers=headers)
+
+
+async def scenario_blog_get(client, ctx, headers):
+    return await client.get(f"/blog/{ctx.blogs.sample()[0]}", headers=headers)
+
+
+async def scenario_comments(client, ctx, headers):
+    return await client.get(f"/comments/{ctx.blogs.sample()[0]}/threads", params={"limit": 20}, headers=headers)
+
+
+async def scenario_comment_create(client, ctx, headers):
+    return await client.post(f"/comments/{ctx.blogs.sample()[0]}", json={"content": "load test comment"}, headers=headers)
+
+
+async def scenario_follow_status(client, ctx, headers):
+    ids = ",".join(str(user_id) for user_id in ctx.people.sample(20))
+    return await client.get("/follow/status", params={"ids": ids}, headers=headers)
+
+
+async def scenario_follow_toggle(client, ctx, headers):
+    user_id = ctx.people.sample()[0]
+    response = await client.post(f"/follow/{user_id}", headers=headers)
+    if response.status_code == 400:  # already following: unfollow instead
+        response = await client.delete(f"/follow/{user_id}", headers=headers)
+    return response
+
+
+async def scenario_user_stats(client, ctx, headers):
+    return await client.get(f"/user/{ctx.people.sample()[0]}/stats", headers=headers)
+
+
+SCENARIOS = {name[len("scenario_"):]: function for name, function in globals().items() if name.startswith("scenario_")}
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    # Nearest rank
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def virtual_user(client, ctx: Context, mix: Dict[str, float], deadline: float, latencies, errors):
+    response = await login(client, ctx, ctx.random_user())
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = ctx.rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await SCENARIOS[name](client, ctx, headers)
+            failed = response.status_code >= 500 or response.status_code == 401  # 403 and 404 are answers too
+        except httpx.HTTPError:
+            failed = True
+        latencies[name].append(time.perf_counter() - started)
+        if failed:
+            errors[name] += 1
+
+
+async def run(args) -> Dict[str, dict]:
+    ctx = Context(args, random.Random(args.seed))
+    mix = parse_mix(args.mix)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, ctx, mix, deadline, latencies, errors) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    report = {}
+    for name in list(mix) + ["all"]:
+        values = sorted(latencies[name] if name != "all" else [value for series in latencies.values() for value in series])
+        if not values:
+            continue
+        report[name] = {
+            "requests": len(values),
+            "errors": errors[name] if name != "all" else sum(errors.values()),
+            "rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users, each with one request in flight")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted scenarios, default {DEFAULT_MIX}")
+    parser.add_argument("--users", type=int, default=10_000, help="as given to generate_data")
+    parser.add_argument("--blogs", type=int, default=20_000, help="as given to generate_data")
+    parser.add_argument("--first-user", type=int, default=1)
+    parser.add_argument("--first-blog", type=int, default=1)
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-p95-ms", type=float, help="exit with status 1 if a scenario's p95 is above this")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'scenario':<16}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for name, row in report.items():
+            print(f"{name:<16}{row['requests']:>10}{row['errors']:>8}{row['rps']:>9.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+    if args.max_p95_ms is not None:
+        slow = [name for name, row in report.items() if name != "all" and row["p95_ms"] > args.max_p95_ms]
+        if slow:
+            print(f"p95 above {args.max_p95_ms} ms: {', '.join(slow)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Check service methods against a stored baseline of query counts and timings.
+
+    python -m benchmarks.services [--update-baseline]
+
+Seeds an in-memory SQLite database with benchmarks.generate_data, then runs each
+case below with a fresh session per call, the way a request gets one. A case fails
+when it issues more SQL statements than the baseline records, which is how an N+1
+pattern or a lazy load sneaking back in shows up, or when its median time exceeds
+the baseline by more than --time-tolerance. Query counts are exact and portable;
+timings depend on the machine, so refresh the baseline with --update-baseline on
+the machine that runs the check, and commit it along with intended changes.
+Exits with status 1 on any failure.
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")  # app.db.database builds its engine on import; it isn't used here
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.auth.auth_utils import create_token, get_current_user
+from app.db import schemas
+from app.db.models import User, Blog, Comment, Follow
+from app.services.blog_service import BlogService
+from app.services.comment_service import CommentService
+from app.services.follow_service import FollowService
+from benchmarks import generate_data
+
+BASELINE = Path(__file__).with_name("services_baseline.json")
+DATASET = ["--users", "500", "--blogs", "2000", "--comments", "10000", "--likes", "20000",
+           "--comment-likes", "10000", "--follows", "10000", "--batch-size", "5000", "--create-tables"]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def seed(engine) -> Dict[str, int]:
+    """Fill the database and pick the ids the cases run against: the busiest ones, where N+1 patterns hurt most."""
+    generate_data.generate(engine, generate_data.parse_args(DATASET))
+    with engine.connect() as conn:
+        def busiest(column):
+            return conn.execute(select(column).group_by(column).order_by(func.count().desc()).limit(1)).scalar()
+        return {
+            "author": busiest(Blog.author_id),
+            "blog": busiest(Comment.blog_id),
+            "followed": busiest(Follow.followed_id),
+            "reader": conn.execute(select(User.id).where(User.role == "reader").limit(1)).scalar(),
+        }
+
+
+def cases(ids: Dict[str, int]) -> Dict[str, Callable]:
+    """Each case takes a fresh session and makes one service call."""
+    def as_user(db, user_id):
+        return schemas.User.model_validate(db.get(User, user_id))
+
+    token = create_token({"sub": str(ids["reader"])})
+    return {
+        "BlogService.get_all_blogs": lambda db: BlogService(db, as_user(db, ids["reader"])).get_all_blogs(),
+        "BlogService.get_all_blogs(user_id)": lambda db: BlogService(db, as_user(db, ids["reader"])).get_all_blogs(ids["author"]),
+        "BlogService.create_blog": lambda db: BlogService(db, as_user(db, ids["author"])).create_blog(
+            schemas.BlogCreate(title="Benchmark", content="Benchmark post", published=True, tag="technology")),
+        "CommentService.get_comments": lambda db: CommentService(db, as_user(db, ids["reader"])).get_comments(None, ids["blog"], include_all=True),
+        "CommentService.get_threads": lambda db: CommentService(db, as_user(db, ids["reader"])).get_threads(ids["blog"]),
+        "FollowService.get_followers": lambda db: FollowService(db, as_user(db, ids["reader"])).get_followers(ids["followed"]),
+        "get_current_user": lambda db: get_current_user(token, db),
+    }
+
+
+def measure(session_factory, counter: QueryCounter, case: Callable, rounds: int) -> Dict[str, float]:
+    timings, queries = [], None
+    for round_ in range(rounds + 1):
+        with session_factory() as db:
+            before = counter.count
+            started = time.perf_counter()
+            case(db)
+            elapsed = time.perf_counter() - started
+            issued = counter.count - before
+        if round_ == 0:
+            continue  # warm-up: compiles and caches statements
+        if queries is not None and issued != queries:
+            raise RuntimeError(f"query count varies between calls ({queries}, {issued})")
+        queries = issued
+        timings.append(elapsed)
+    return {"queries": queries, "median_ms": round(statistics.median(timings) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--time-tolerance", type=float, default=1.5, help="fail when a median exceeds baseline times this")
+    parser.add_argument("--update-baseline", action="store_true", help=f"write the results to {BASELINE.name} instead of checking")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    ids = seed(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = QueryCounter(engine)  # after seeding, so only the cases are counted
+    results = {name: measure(session_factory, counter, case, args.rounds) for name, case in cases(ids).items()}
+
+    if args.update_baseline:
+        BASELINE.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"wrote {BASELINE}")
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+
+    failures = []
+    print(f"{'case':<40}{'queries':>9}{'baseline':>10}{'median ms':>11}{'baseline':>10}")
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            print(f"{name:<40}{result['queries']:>9}{'-':>10}{result['median_ms']:>11.2f}{'-':>10}")
+            failures.append(f"{name}: no baseline, run with --update-baseline")
+            continue
+        print(f"{name:<40}{result['queries']:>9}{expected['queries']:>10}{result['median_ms']:>11.2f}{expected['median_ms']:>10.2f}")
+        if result["queries"] > expected["queries"]:
+            failures.append(f"{name}: {result['queries']} queries, baseline {expected['queries']}")
+        if result["median_ms"] > expected["median_ms"] * args.time_tolerance:
+            failures.append(f"{name}: {result['median_ms']:.2f} ms, baseline {expected['median_ms']:.2f} ms")
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
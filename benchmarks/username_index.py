@@ -0,0 +1,68 @@
+"""
+Benchmark username prefix lookups on a synthetic user table.
+
+    python -m benchmarks.username_index --users 200000 --lookups 200000
+
+Lookups replay the prefixes of random usernames (1-6 characters), the way an
+autocomplete box sends them, so short prefixes are hot and long ones are rare.
+"""
+import argparse
+import random
+import string
+import time
+
+from app.services.username_index import UsernameIndex
+
+
+def synthetic_users(users: int, seed: int):
+    rng = random.Random(seed)
+    syllables = ["al", "an", "be", "ca", "da", "el", "fe", "jo", "ka", "li", "ma", "ni", "ol", "ra", "sa", "to", "vi", "ze"]
+    rows = []
+    for user_id in range(1, users + 1):
+        name = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.5:
+            name += str(rng.randint(1, 9999))
+        rows.append((user_id, name.capitalize() if rng.random() < 0.3 else name, int(rng.paretovariate(1.2)) - 1))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = synthetic_users(args.users, args.seed)
+    index = UsernameIndex()
+    started = time.perf_counter()
+    index.load(rows)
+    print(f"indexed {len(index)} usernames in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(args.seed + 1)
+    prefixes = []
+    while len(prefixes) < args.lookups:
+        name = rng.choice(rows)[1]
+        prefixes.extend(name[:end] for end in range(1, min(len(name), 6) + 1))
+    prefixes = prefixes[:args.lookups]
+
+    started = time.perf_counter()
+    for prefix in prefixes:
+        index.search(prefix)
+    elapsed = time.perf_counter() - started
+    print(f"{len(prefixes)} lookups in {elapsed:.2f}s: {len(prefixes) / elapsed:,.0f} lookups/s (cold and warm mixed)")
+
+    started = time.perf_counter()
+    for prefix in prefixes:
+        index.search(prefix)
+    elapsed = time.perf_counter() - started
+    print(f"{len(prefixes)} lookups in {elapsed:.2f}s: {len(prefixes) / elapsed:,.0f} lookups/s (warm)")
+
+    started = time.perf_counter()
+    for user_id in range(args.users + 1, args.users + 1001):
+        index.add(user_id, "".join(rng.choice(string.ascii_lowercase) for _ in range(8)))
+    print(f"1000 registrations in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
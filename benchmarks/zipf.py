@@ -0,0 +1,16 @@
+import itertools
+import random
+from typing import List, Sequence
+
+
+class Zipf:
+    """Draws items with probability proportional to 1 / rank**exponent; ranks are shuffled over the items."""
+
+    def __init__(self, items: Sequence[int], exponent: float, rng: random.Random):
+        self.items = list(items)
+        rng.shuffle(self.items)  # so popularity isn't tied to id order
+        self.cum_weights = list(itertools.accumulate(1 / rank ** exponent for rank in range(1, len(self.items) + 1)))
+        self.rng = rng
+
+    def sample(self, k: int = 1) -> List[int]:
+        return self.rng.choices(self.items, cum_weights=self.cum_weights, k=k)